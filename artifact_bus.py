@@ -0,0 +1,102 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from log_record import json_default
+from constants import ARTIFACT_WRITE_WORKERS
+
+
+class ArtifactBus:
+    """
+    한 실행 동안 fetch / build 단계가 주고받는 파싱된 객체 저장소 (./virtual_env 파일 경로 기준)
+    build 단계는 메모리의 객체를 그대로 사용하고, 파일은 다음 실행 cache 용으로 background 에서 compact JSON 으로 저장
+    """
+
+    def __init__(self, max_workers=ARTIFACT_WRITE_WORKERS):
+        self.max_workers = max_workers
+        self._values = {}
+        self._futures = []
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def put(self, path, value, persist=True):
+        """
+        객체를 메모리에 두고 persist 면 파일 저장 예약
+        저장 이후 객체에 추가되는 필드(node_id 등)와 겹치지 않도록 문자열 변환은 호출한 thread 에서 수행
+        """
+        with self._lock:
+            self._values[path] = value
+        if not persist:
+            return
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(self._executor.submit(_write_text, path, text))
+
+    def get(self, path, default=None):
+        """메모리에 있으면 그대로, 없으면 파일을 한 번 읽어 보관 (파일도 없으면 default)"""
+        with self._lock:
+            if path in self._values:
+                return self._values[path]
+        if not os.path.isfile(path):
+            return default
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading {path}: {e}")
+            return default
+        with self._lock:
+            return self._values.setdefault(path, value)
+
+    def is_loaded(self, path):
+        """이번 실행에서 메모리에 올라온 객체인지 (파일은 확인하지 않음)"""
+        with self._lock:
+            return path in self._values
+
+    def exists(self, path):
+        with self._lock:
+            if path in self._values:
+                return True
+        return os.path.isfile(path)
+
+    def flush(self):
+        """예약된 파일 저장이 끝날 때까지 대기"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in wait(futures).done:
+            if future.exception():
+                print(f"Error writing artifact: {future.exception()}")
+
+
+def _write_text(path, text):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+default_bus = ArtifactBus()
+
+
+def put_artifact(path, value, persist=True):
+    default_bus.put(path, value, persist)
+
+
+def get_artifact(path, default=None):
+    return default_bus.get(path, default)
+
+
+def has_artifact(path):
+    return default_bus.exists(path)
+
+
+def is_artifact_loaded(path):
+    return default_bus.is_loaded(path)
+
+
+def flush_artifacts():
+    default_bus.flush()
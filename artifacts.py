@@ -0,0 +1,42 @@
+import threading
+
+from lambda_index import TraceIndex
+from xray_client import get_xray_trace
+from utils import get_hook_trace_index
+from artifact_bus import get_artifact
+
+
+class ContactArtifacts:
+    """
+    Contact 하나의 그래프를 만드는 동안 여러 builder 가 공유하는 파일, 인덱스, X-Ray 서브 그래프
+    처음 요청될 때 한 번만 읽거나 생성하고 이후에는 같은 값을 반환
+    """
+
+    def __init__(self, contact_id, region):
+        self.contact_id = contact_id
+        self.region = region
+        self._values = {}
+        self._lock = threading.RLock()
+
+    def once(self, key, factory):
+        """key 별로 factory 를 한 번만 실행하고 결과를 재사용"""
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = factory()
+            return self._values[key]
+
+    def lex_hook_logs(self):
+        return get_artifact(f"./virtual_env/lex_hook_{self.contact_id}.json", [])
+
+    def lex_hook_trace_index(self):
+        return self.once("lex_hook_trace_index", lambda: TraceIndex(self.lex_hook_logs()))
+
+    def lex_hook_timestamp_index(self):
+        return self.once("lex_hook_timestamp_index", lambda: get_hook_trace_index(self.lex_hook_logs()))
+
+    def xray_trace(self, xray_trace_id):
+        return self.once(("xray_trace", xray_trace_id), lambda: get_xray_trace(xray_trace_id, self.region))
+
+    def xray_graph(self, xray_trace_file, build):
+        """X-Ray 서브 그래프 파일은 처음 참조될 때 한 번만 생성 (또는 지연 생성 등록)"""
+        return self.once(("xray_graph", xray_trace_file), build)
@@ -1,3 +1,4 @@
+import os
 import json
 
 # Error 로 인식하는 Results Keyword
@@ -8,6 +9,14 @@ ERROR_KEYWORDS = [
     'The Lambda Function Returned An Error.'
 ]
 
+# Error 로 인식하는 사용자 정의 규칙 (ERROR_KEYWORDS 와 함께 하나의 matcher 로 컴파일)
+# name : 규칙 이름, module_type : 적용할 ContactFlowModuleType (생략 시 전체), field : 점(.)으로 구분한 필드 경로
+# equals / in / contains : 비교 조건
+ERROR_RULES = [
+    {'name': 'LambdaFailed', 'module_type': 'InvokeExternalResource', 'field': 'ExternalResults.isSuccess', 'equals': 'false'},
+    {'name': 'LambdaLogLevel', 'field': 'level', 'in': ['ERROR', 'WARN']},
+]
+
 # 반복되는 Flow Block 중복 제거
 DUP_CONTACT_FLOW_MODULE_TYPE = ['SetAttributes', 'SetFlowAttributes']
 
@@ -17,6 +26,62 @@ OMIT_CONTACT_FLOW_MODULE_TYPE = ['InvokeFlowModule']
 # 순차적으로 뭉쳐 하나의 노드로 표시할 Contact Flow Names
 GROUPED_CONTACT_FLOW_NAMES = ['06_AgentWhisper', '06_CustomerWhisper', '06_AgentHold', '06_CustomerHold', '06_AgentWhisper_Transfer','06_CustomerWhisper_Transfer','06_AgentHold_Transfer','06_CustomerHold_Transfer']
 
+# Drill-down 서브 그래프 지연 생성 여부
+# True : 클릭 시 생성, False : 메인 그래프 표시 전에 모두 생성
+LAZY_SUBGRAPH_FLAG = False
+
+# 지연 생성 모드에서 남은 서브 그래프를 background 에서 미리 생성할지 여부
+LAZY_PRECOMPUTE_FLAG = False
+
+# 상세 그래프 한 페이지에 표시할 최대 노드 수 (초과 시 이전/다음 이동 노드가 있는 페이지로 분할, 0 이면 분할 안 함)
+GRAPH_NODE_BUDGET = 300
+
+# 반복되는 block / Flow 구간을 하나의 노드로 압축할지 여부
+LOOP_COMPRESSION_FLAG = True
+
+# 압축할 최소 반복 횟수와 반복 단위(block 수) 최대 길이
+LOOP_MIN_REPEAT = 3
+LOOP_MAX_PERIOD = 12
+
+# apply_rank 격자 배치를 Python 에서 직접 계산할지 여부
+# True : node 좌표(pos)를 지정하고 neato -n 으로 edge 만 계산, False : dot 엔진의 rank=same 배치
+GRID_LAYOUT_FLAG = True
+
+# 입력(DOT source)이 바뀌지 않은 그래프의 render 생략 여부
+# True : ./virtual_env/render_manifest.json 의 hash 와 같으면 기존 파일 재사용
+INCREMENTAL_RENDER_FLAG = True
+
+# 입력(로그, Lambda 로그, Flow 정의, X-Ray trace, 설정)이 바뀌지 않은 Contact 그래프 / Lex 그래프 builder 생략 여부
+# True : ./virtual_env/build_manifest.json 의 hash 와 같고 render 결과 파일이 남아 있으면 기록된 결과 재사용 (지연 생성 모드 제외)
+INCREMENTAL_BUILD_FLAG = True
+
+# 구조(node 순서, 모듈 타입, label 크기, edge)가 같은 그래프의 레이아웃 좌표 재사용 여부
+# True : ./virtual_env/layout_cache 의 좌표로 neato -n2 render (label 만 다시 그림)
+LAYOUT_CACHE_FLAG = True
+
+# Flow / Module 노드의 상세 그래프를 Flow 정의(describe JSON) 레이아웃 위에 실행 경로를 표시한 그래프로 대체할지 여부
+# True : 정의 버전별로 한 번 계산한 레이아웃을 재사용 (실행되지 않은 block 도 표시), 정의 파일이 없으면 기존 상세 그래프
+FLOW_DEFINITION_VIEW_FLAG = False
+
+# X-Ray BatchGetTraces 한 번에 요청할 trace ID 수 (API 최대 5) 와 동시 요청 수
+XRAY_BATCH_SIZE = 5
+XRAY_MAX_WORKERS = 8
+
+# X-Ray block 노드에 표시할 가장 오래 걸린 호출 수 (0 이면 표시 안 함)
+XRAY_SLOWEST_CALL_COUNT = 2
+
+# 로그 / 정의 / X-Ray JSON 파일을 background 에서 저장하는 thread 수 (build 단계는 메모리의 객체를 사용)
+ARTIFACT_WRITE_WORKERS = 2
+
+# build_main_contacts 작업 DAG 의 종류별 동시 실행 수
+# AWS I/O : CloudWatch / Connect / X-Ray 조회, CPU : 그래프 생성, Graphviz : render 프로세스
+TASK_IO_WORKERS = 8
+TASK_CPU_WORKERS = 3
+GRAPHVIZ_MAX_WORKERS = os.cpu_count() or 4
+
+# 그래프 builder 출력 형식 버전 (builder 코드 변경 시 올려 기존 render 결과 무효화)
+GRAPH_BUILDER_VERSION = "1"
+
 # Associated Contact 조회 여부
 # True : 여러 관련된 Contact 조회, False : 입력된 하나의 Contact만 조회
 ASSOCIATED_CONTACTS_FLAG = True
@@ -1,8 +1,9 @@
 import boto3
 import json
-import os
 import re
 
+from artifact_bus import put_artifact, get_artifact
+
 
 def extract_ids_from_arn(arn):
     """ARN에서 instance_id 및 flow_id 또는 flow_module_id 추출"""
@@ -18,10 +19,17 @@ def extract_ids_from_arn(arn):
     return None, None, None
 
 
+def get_describe_path(arn):
+    """Flow / Module ARN 에 해당하는 describe JSON 파일 경로 (ARN 형식이 아니면 None)"""
+    _, entity_type, entity_id = extract_ids_from_arn(arn or "")
+    if not entity_type or not entity_id:
+        return None
+    return f"./virtual_env/describe_{entity_type}_{entity_id}.json"
+
+
 def save_json(data, filename):
-    """JSON 데이터를 파일로 저장"""
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """JSON 데이터를 메모리에 두고 파일 저장 예약"""
+    put_artifact(filename, data)
 
 
 def get_contact_flow(flow_arn, region):
@@ -36,9 +44,8 @@ def get_contact_flow(flow_arn, region):
         ContactFlowId=flow_id
     )
 
-    jsonfile_name = f"./virtual_env/describe_{entity_type}_{flow_id}.json"
     content = json.loads(response["ContactFlow"]["Content"])
-    save_json(content, jsonfile_name)
+    save_json(content, get_describe_path(flow_arn))
 
 
 def get_contact_flow_module(flow_module_arn, region):
@@ -53,20 +60,16 @@ def get_contact_flow_module(flow_module_arn, region):
         ContactFlowModuleId=flow_module_id
     )
 
-    jsonfile_name = f"./virtual_env/describe_{entity_type}_{flow_module_id}.json"
     content = json.loads(response["ContactFlowModule"]["Content"])
-    save_json(content, jsonfile_name)
+    save_json(content, get_describe_path(flow_module_arn))
 
 
 def get_contact_attributes(file_name):
     """AWS Connect Contact Attributes 정보 가져오기"""
-    file_path = f"./virtual_env/{file_name}"
-    if not os.path.isfile(file_path):
+    flow_json = get_artifact(f"./virtual_env/{file_name}")
+    if flow_json is None:
         return None
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        flow_json = json.loads(f.read())
-
     comparison_values = {}
     for action in flow_json["Actions"]:
         action_type = action.get("Type")
@@ -87,11 +90,9 @@ def get_contact_attributes(file_name):
 
 def _load_target_block(flow_module_arn, block_id):
     """flow JSON에서 block_id에 해당하는 액션 블록을 반환"""
-    instance_id, entity_type, flow_id = extract_ids_from_arn(flow_module_arn)
-    jsonfile_name = f"./virtual_env/describe_{entity_type}_{flow_id}.json"
-    with open(jsonfile_name, encoding="utf-8") as file:
-        src = json.load(file)
-    return [action for action in src["Actions"] if action["Identifier"] == block_id]
+    path = get_describe_path(flow_module_arn)
+    src = (get_artifact(path) if path else None) or {}
+    return [action for action in src.get("Actions", []) if action["Identifier"] == block_id]
 
 
 def get_comparison_value(flow_module_arn, block_id, comparison_keyword):
@@ -1,16 +1,55 @@
 import json
 import os
 import traceback
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import boto3
 from graphviz import Digraph
 
-from utils import fetch_logs
+from utils import query_contact_logs, fetch_flow_definition, fetch_lambda_logs, get_lambda_function_name, merge_lambda_logs
 from flow_builder import build_main_flow
-from lex_builder import build_lex_dot, build_lex_hook_dot
+from lex_builder import build_lex_dot, build_lex_hook_dot, has_lex_logs
+from xray_client import get_pending_batches, fetch_xray_batch, collect_trace_ids, collect_lambda_trace_ids, get_trace_file_path
+from describe_flow import get_describe_path
+from artifacts import ContactArtifacts
+from artifact_bus import get_artifact
+from lazy_graphs import register_lazy_graph
+from graph_render import cached_build
 from graph_labels import get_image_label
-from constants import ASSOCIATED_CONTACTS_FLAG
+from node_store import put_payload, flush_payload_stores
+from task_graph import TaskGraph
+from constants import ASSOCIATED_CONTACTS_FLAG, LAZY_SUBGRAPH_FLAG, TASK_IO_WORKERS, TASK_CPU_WORKERS
+
+
+def get_trace_documents(trace_ids):
+    """trace ID 별 cache 된 X-Ray segment document"""
+    return {trace_id: get_artifact(get_trace_file_path(trace_id)) for trace_id in dict.fromkeys(trace_ids)}
+
+
+def build_contact_flow(logs, lambda_logs, contact_id, env, region):
+    """Contact 메인 그래프 생성 (로그, Lambda 로그, Flow 정의, X-Ray trace 가 이전 실행과 같으면 기록된 그래프 재사용)"""
+    def get_inputs():
+        describe_paths = dict.fromkeys(get_describe_path(log.get("ContactFlowId")) for log in logs)
+        return {
+            "contact_id": contact_id, "env": env, "region": region,
+            "logs": logs, "lambda_logs": lambda_logs,
+            "definitions": {path: get_artifact(path) for path in describe_paths if path},
+            "xray": get_trace_documents(collect_lambda_trace_ids(lambda_logs)),
+        }
+
+    def dump(output):
+        contact_graph, nodes = output
+        return {"comment": contact_graph.comment, "body": list(contact_graph.body), "nodes": list(nodes)}
+
+    def load(output):
+        contact_graph = Digraph(comment=output["comment"])
+        contact_graph.body.extend(output["body"])
+        return contact_graph, output["nodes"]
+
+    return cached_build(
+        f"flow:{contact_id}", get_inputs,
+        lambda: build_main_flow(logs, lambda_logs, contact_id, env, region),
+        dump, load
+    )
 
 
 def build_main_contacts(selected_contact_id, associated_contacts, initiation_timestamp, region, log_group, env, instance_id):
@@ -27,34 +66,31 @@ def build_main_contacts(selected_contact_id, associated_contacts, initiation_tim
 
     subgraphs = {}
     subgraph_nodes = {}
-    subcontact_logs = {}
-    subcontact_lambda_logs = {}
     subcontact_attr = {}
     root_contact_ids = {}
 
-    def _fetch_contact_data(contact):
-        """단일 contact에 대한 로그 및 속성을 가져오는 헬퍼 함수"""
-        contact_id = contact.get("ContactId")
-        if not contact_id:
-            return None
-
-        logs, lambda_logs, _ = fetch_logs(contact_id, initiation_timestamp, region, log_group, env, instance_id)
+    # Contact 조회, Flow 정의, Lambda 로그 그룹, X-Ray 묶음, 그래프 생성을 작업 단위로 나눠
+    # 입력이 준비된 작업부터 실행 (AWS I/O 와 그래프 생성의 동시 실행 수는 따로 제한)
+    tasks = TaskGraph({"io": TASK_IO_WORKERS, "cpu": TASK_CPU_WORKERS})
 
+    def _get_contact_attributes(contact_id):
         connect_client = boto3.client("connect", region_name=region)
         response = connect_client.get_contact_attributes(
             InstanceId=instance_id,
             InitialContactId=contact_id
         )
-        contact_attrs = response["Attributes"]
+        return response["Attributes"]
+
+    def _get_attribute_data(logs, contact_attrs):
+        # Key 별 최초 SetAttributes 로그 (payload decode 는 SetAttributes 레코드에 대해 한 번만)
+        attribute_logs = {}
+        for log in logs:
+            if log.get("ContactFlowModuleType") == "SetAttributes" and "Parameters" in log:
+                attribute_logs.setdefault(log["Parameters"].get("Key"), log)
 
         data = []
         for k, v in contact_attrs.items():
-            matched_log = None
-            for log in logs:
-                if log.get("ContactFlowModuleType") == "SetAttributes" and "Parameters" in log:
-                    if log["Parameters"].get("Key") == k:
-                        matched_log = log
-                        break
+            matched_log = attribute_logs.get(k)
 
             entry = {
                 "k": k,
@@ -64,33 +100,122 @@ def build_main_contacts(selected_contact_id, associated_contacts, initiation_tim
             }
             data.append(entry)
 
-        return contact_id, logs, lambda_logs, data
+        return data
+
+    def _fetch_lambda_group(contact_id, lambda_log_group):
+        try:
+            return fetch_lambda_logs(contact_id, initiation_timestamp, region, lambda_log_group)
+        except Exception as e:
+            print(f"Error fetching lambda logs for {get_lambda_function_name(lambda_log_group)}: {e}")
+            return []
+
+    def _fetch_contact_logs(contact_id):
+        """Contact Flow 로그를 가져오고, 로그에 나온 Flow 정의 / Lambda 로그 그룹 조회 작업 추가"""
+        logs, contact_flow_ids, lambda_log_groups, backup_lambda_logs = query_contact_logs(
+            contact_id, initiation_timestamp, region, log_group, env, instance_id
+        )
+
+        # 같은 Flow 정의는 여러 Contact 에서 참조해도 한 번만 조회
+        describe_tasks = [f"describe:{contact_flow_id}" for contact_flow_id in contact_flow_ids]
+        for name, contact_flow_id in zip(describe_tasks, contact_flow_ids):
+            tasks.add(name, lambda contact_flow_id=contact_flow_id: fetch_flow_definition(contact_flow_id, region), pool="io")
+        tasks.add(f"describes:{contact_id}", lambda *_: None, deps=describe_tasks)
 
-    # Associated contact 로그를 병렬로 가져오기
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {
-            executor.submit(_fetch_contact_data, contact): contact
-            for contact in search_contacts
+        if backup_lambda_logs is not None:
+            tasks.add(f"lambda:{contact_id}", lambda: backup_lambda_logs)
+        else:
+            lambda_log_groups = sorted(lambda_log_groups)
+            lambda_tasks = [f"lambda:{contact_id}:{lg}" for lg in lambda_log_groups]
+            for name, lg in zip(lambda_tasks, lambda_log_groups):
+                tasks.add(name, lambda lg=lg: _fetch_lambda_group(contact_id, lg), pool="io")
+            tasks.add(
+                f"lambda:{contact_id}",
+                lambda *results: merge_lambda_logs(dict(zip(map(get_lambda_function_name, lambda_log_groups), results))),
+                deps=lambda_tasks
+            )
+        return logs
+
+    def _fetch_xray_traces(contact_id, lambda_logs):
+        """Lambda / Lex Hook 로그의 X-Ray trace 중 cache 에 없는 것을 묶음 단위 조회 작업으로 추가"""
+        xray_trace_ids = collect_lambda_trace_ids(lambda_logs)
+        xray_trace_ids.extend(collect_trace_ids(get_artifact(f"./virtual_env/lex_hook_{contact_id}.json", [])))
+
+        batch_tasks = []
+        for i, batch in enumerate(get_pending_batches(xray_trace_ids)):
+            batch_tasks.append(f"xray:{contact_id}:{i}")
+            tasks.add(batch_tasks[-1], lambda batch=batch: fetch_xray_batch(region, batch), pool="io")
+        tasks.add(f"xray_done:{contact_id}", lambda *_: None, deps=batch_tasks)
+
+    def _get_lex_inputs(contact_id):
+        hook_logs = get_artifact(f"./virtual_env/lex_hook_{contact_id}.json", [])
+        return {
+            "contact_id": contact_id, "region": region,
+            "lex_logs": get_artifact(f"./virtual_env/lex_{contact_id}.json", []),
+            "lex_hook_logs": hook_logs,
+            "xray": get_trace_documents(collect_trace_ids(hook_logs)),
         }
-        for future in as_completed(futures):
-            contact = futures[future]
-            contact_id = contact.get("ContactId")
-            try:
-                result = future.result()
-                if result is None:
-                    continue
-                cid, logs, lambda_logs, data = result
-                subcontact_logs[cid] = logs
-                subcontact_lambda_logs[cid] = lambda_logs
-                subcontact_attr[cid] = data
-            except Exception as e:
-                print(f"Error fetching contact {contact_id}: {e}")
+
+    def _build_lex_nodes(contact_id):
+        """Lex 대화 / Hook 그래프 생성 (같은 Hook 로그와 X-Ray 서브 그래프를 공유)"""
+        artifacts = ContactArtifacts(contact_id, region)
+
+        if LAZY_SUBGRAPH_FLAG:
+            lex_nodes = has_lex_logs(f"./virtual_env/lex_{contact_id}.json")
+            if lex_nodes:
+                register_lazy_graph(f"./virtual_env/lex_{contact_id}.dot", lambda: build_lex_dot(contact_id, region, artifacts))
+        else:
+            lex_nodes = build_lex_dot(contact_id, region, artifacts)
+
+        if LAZY_SUBGRAPH_FLAG:
+            lex_hook_nodes = has_lex_logs(f"./virtual_env/lex_hook_{contact_id}.json")
+            if lex_hook_nodes:
+                register_lazy_graph(f"./virtual_env/lex_hook_{contact_id}.dot", lambda: build_lex_hook_dot(contact_id, region, artifacts))
+        else:
+            lex_hook_nodes, _ = build_lex_hook_dot(contact_id, region, artifacts)
+
+        return bool(lex_nodes), bool(lex_hook_nodes)
 
     for contact in search_contacts:
         contact_id = contact.get("ContactId")
-        if not contact_id or contact_id not in subcontact_logs:
+        if not contact_id:
             continue
 
+        tasks.add(f"logs:{contact_id}", lambda contact_id=contact_id: _fetch_contact_logs(contact_id), pool="io")
+        tasks.add(f"attrs:{contact_id}", lambda contact_id=contact_id: _get_contact_attributes(contact_id), pool="io")
+        tasks.add(
+            f"attr_data:{contact_id}", _get_attribute_data,
+            deps=[f"logs:{contact_id}", f"attrs:{contact_id}"]
+        )
+        tasks.add(
+            f"xray:{contact_id}", lambda lambda_logs, contact_id=contact_id: _fetch_xray_traces(contact_id, lambda_logs),
+            deps=[f"lambda:{contact_id}"]
+        )
+        # Flow 그래프는 Flow 정의 / Lambda 로그 / X-Ray 가 모두 준비되어야 생성
+        tasks.add(
+            f"flow:{contact_id}",
+            lambda logs, lambda_logs, *_, contact_id=contact_id: build_contact_flow(logs, lambda_logs, contact_id, env, region),
+            deps=[f"logs:{contact_id}", f"lambda:{contact_id}", f"describes:{contact_id}", f"xray_done:{contact_id}"]
+        )
+        tasks.add(
+            f"lex:{contact_id}",
+            lambda *_, contact_id=contact_id: cached_build(
+                f"lex:{contact_id}", lambda: _get_lex_inputs(contact_id), lambda: _build_lex_nodes(contact_id), load=tuple
+            ),
+            deps=[f"lambda:{contact_id}", f"xray_done:{contact_id}"]
+        )
+
+    results = tasks.run()
+
+    for contact in search_contacts:
+        contact_id = contact.get("ContactId")
+        if not contact_id:
+            continue
+        if f"logs:{contact_id}" not in results:
+            print(f"Error fetching contact {contact_id}")
+            continue
+        if f"attr_data:{contact_id}" in results:
+            subcontact_attr[contact_id] = results[f"attr_data:{contact_id}"]
+
         channel = contact.get("Channel")
         label = (
             f"Contact Id : {contact_id} ✅ \nChannel : {channel}"
@@ -115,61 +240,37 @@ def build_main_contacts(selected_contact_id, associated_contacts, initiation_tim
                         entry["i"] = other_entry["i"]
                         break
 
-    def _build_contact_graph(contact):
-        """단일 contact에 대해 그래프를 빌드하는 헬퍼 함수"""
-        contact_id = contact.get("ContactId")
-        if not contact_id or contact_id not in subcontact_logs:
-            return None
-
-        logs = subcontact_logs[contact_id]
-        lambda_logs = subcontact_lambda_logs[contact_id]
+    for contact_id in subgraphs:
+        if f"flow:{contact_id}" not in results or contact_id not in subcontact_attr:
+            print(f"Error building graph for {contact_id}")
+            continue
 
-        contact_graph, nodes = build_main_flow(logs, lambda_logs, contact_id, env, region)
+        contact_graph, nodes = results[f"flow:{contact_id}"]
+        has_lex, has_lex_hook = results.get(f"lex:{contact_id}", (False, False))
 
-        lex_nodes = build_lex_dot(contact_id, region)
-        if lex_nodes:
+        if has_lex:
             contact_graph.node(
                 contact_id + "_lex_script",
                 label=get_image_label(f"{os.getcwd()}/mnt/aws/Lex.png", "Lex", 30),
                 shape="plaintext",
                 URL=f"./virtual_env/lex_{contact_id}.dot"
             )
-
-        lex_hook_nodes, _ = build_lex_hook_dot(contact_id, region)
-        if lex_hook_nodes:
+        if has_lex_hook:
             contact_graph.node(
                 contact_id + "_lex_hook",
                 label=get_image_label(f"{os.getcwd()}/mnt/aws/Lambda.png", "Lex Hook", 30),
                 shape="plaintext",
                 URL=f"./virtual_env/lex_hook_{contact_id}.dot"
             )
-
         contact_graph.node(
             contact_id + "_attributes",
             label=get_image_label(f"{os.getcwd()}/mnt/img/SetAttributes.png", "Attributes", 30),
             shape="plaintext",
-            URL=f'{subcontact_attr[contact_id]}'
+            URL=put_payload(contact_id, subcontact_attr[contact_id])
         )
 
-        return contact_id, contact_graph, nodes
-
-    # Associated contact별 그래프 빌드 병렬 처리
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {
-            executor.submit(_build_contact_graph, contact): contact
-            for contact in search_contacts
-        }
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                if result is None:
-                    continue
-                cid, contact_graph, nodes = result
-                subgraphs[cid].subgraph(contact_graph)
-                subgraph_nodes[cid] = nodes
-            except Exception as e:
-                contact = futures[future]
-                print(f"Error building graph for {contact.get('ContactId')}: {e}")
+        subgraphs[contact_id].subgraph(contact_graph)
+        subgraph_nodes[contact_id] = nodes
 
     for contact in search_contacts:
         contact_id = contact.get("ContactId")
@@ -184,7 +285,8 @@ def build_main_contacts(selected_contact_id, associated_contacts, initiation_tim
         if related_id:
             root_contact_ids[contact_id] = contact.get("InitiationMethod")
 
-        dot.subgraph(subgraphs[contact_id])
+        if contact_id in subgraphs:
+            dot.subgraph(subgraphs[contact_id])
 
         try:
             if related_id and subgraph_nodes.get(related_id) and subgraph_nodes.get(contact_id):
@@ -198,4 +300,6 @@ def build_main_contacts(selected_contact_id, associated_contacts, initiation_tim
         if subgraph_nodes.get(contact_id):
             dot.edge("start", subgraph_nodes[contact_id][0], label=initiation_method)
 
+    flush_payload_stores()
+
     return dot
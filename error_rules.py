@@ -0,0 +1,86 @@
+import re
+from collections.abc import Mapping
+
+from log_record import set_derived, get_derived
+from constants import ERROR_KEYWORDS, ERROR_RULES
+
+# 레코드의 파생 값으로 보관하는 일치 규칙 이름 (로그 필드에는 추가하지 않음)
+ERROR_RULE_NAME = "error_rule"
+
+
+def _get_field(record, path):
+    """점(.)으로 구분된 경로의 값을 반환 (없으면 None)"""
+    value = record
+    for key in path.split("."):
+        if not isinstance(value, Mapping) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def _compile_rule(rule):
+    """사용자 정의 규칙을 (이름, module_type, predicate) 로 변환"""
+    field = rule["field"]
+    if "equals" in rule:
+        expected = rule["equals"]
+        predicate = lambda r: _get_field(r, field) == expected
+    elif "in" in rule:
+        expected = frozenset(rule["in"])
+        predicate = lambda r: _get_field(r, field) in expected
+    elif "contains" in rule:
+        pattern = re.compile(re.escape(rule["contains"]))
+        predicate = lambda r: isinstance(_get_field(r, field), str) and pattern.search(_get_field(r, field)) is not None
+    else:
+        raise ValueError(f"Invalid error rule : {rule}")
+    return rule["name"], rule.get("module_type"), predicate
+
+
+class ErrorClassifier:
+    """ERROR_KEYWORDS 와 사용자 정의 규칙을 하나의 matcher 로 컴파일한 Error 분류기"""
+
+    def __init__(self, keywords=ERROR_KEYWORDS, rules=ERROR_RULES):
+        self._keyword_pattern = re.compile("|".join(re.escape(k) for k in keywords)) if keywords else None
+        self._rules = [_compile_rule(rule) for rule in rules]
+
+    def match(self, record):
+        """일치한 규칙 이름 반환 (Error 가 아니면 None)"""
+        results = record.get("Results")
+        if self._keyword_pattern and isinstance(results, str):
+            found = self._keyword_pattern.search(results)
+            if found:
+                return f"Results:{found.group(0)}"
+
+        module_type = record.get("ContactFlowModuleType")
+        for name, rule_module_type, predicate in self._rules:
+            if rule_module_type and rule_module_type != module_type:
+                continue
+            if predicate(record):
+                return name
+        return None
+
+    def classify(self, record):
+        """일치한 규칙 이름을 레코드의 파생 값으로 보관하고 Error 여부 반환"""
+        return set_derived(record, ERROR_RULE_NAME, self.match(record)) is not None
+
+    def classify_all(self, records):
+        for record in records:
+            self.classify(record)
+        return records
+
+
+default_classifier = ErrorClassifier()
+
+
+def classify_records(records):
+    """ingest 시점에 레코드 목록을 한 번 분류"""
+    return default_classifier.classify_all(records)
+
+
+def get_error_rule(record):
+    """레코드가 일치한 규칙 이름 (Error 가 아니면 None, ingest 를 거치지 않은 레코드는 여기서 분류)"""
+    return get_derived(record, ERROR_RULE_NAME, lambda: default_classifier.match(record))
+
+
+def is_error(record):
+    """미리 계산된 Error 판정 반환"""
+    return get_error_rule(record) is not None
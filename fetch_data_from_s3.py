@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
 
+from artifact_bus import put_artifact
+
 
 log_pattern = re.compile(r"\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}")
 
@@ -217,14 +219,12 @@ def decompress_datadog_logs(env, contact_id, instance_id, region):
     lambda_output_json_path = f"./virtual_env/lambda_logs_{contact_id}.json"
 
     if len(logs) > 0:
-        with open(output_json_path, "w", encoding="utf-8") as json_file:
-            json.dump(logs, json_file, ensure_ascii=False, indent=4)
-            print(f"{output_json_path} saved!!!")
+        put_artifact(output_json_path, logs)
+        print(f"{output_json_path} saved!!!")
 
     if len(lambda_logs) > 0:
-        with open(lambda_output_json_path, "w", encoding="utf-8") as json_file:
-            json.dump(lambda_logs, json_file, ensure_ascii=False, indent=4)
-            print(f"{lambda_output_json_path} saved!!!")
+        put_artifact(lambda_output_json_path, lambda_logs)
+        print(f"{lambda_output_json_path} saved!!!")
 
     return logs, lambda_logs
 
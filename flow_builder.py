@@ -1,28 +1,27 @@
-import json
-import sys
 import traceback
 
-from datetime import datetime
 from collections import defaultdict
 from graphviz import Digraph
 
-from utils import apply_rank, get_func_name, calculate_timestamp_gap
+from utils import apply_rank, get_func_name, group_logs_by_flow
+from timestamps import get_epoch_ms, format_epoch_ms
 from graph_labels import (
     get_node_label, get_module_name_ko, get_node_text_by_module_type,
     define_module_type, add_edges
 )
 from xray_builder import build_xray_dot
-from constants import ERROR_KEYWORDS, DUP_CONTACT_FLOW_MODULE_TYPE, OMIT_CONTACT_FLOW_MODULE_TYPE
-
-
-def is_lambda_error(log):
-    """Lambda InvokeExternalResource 결과가 실패인지 확인"""
-    if log.get('ContactFlowModuleType') == "InvokeExternalResource":
-        try:
-            return log.get("ExternalResults", {})["isSuccess"] == "false"
-        except (KeyError, TypeError):
-            return False
-    return False
+from error_rules import is_error as is_error_record
+from node_store import put_payload
+from graph_render import render_graph
+from graph_paging import paginate_graph
+from lazy_graphs import register_lazy_graph
+from flow_definition import build_definition_overlay
+from loop_compression import LoopSegment, compress_sequence
+from lambda_index import as_lambda_logs
+from constants import (
+    DUP_CONTACT_FLOW_MODULE_TYPE, OMIT_CONTACT_FLOW_MODULE_TYPE, LAZY_SUBGRAPH_FLAG, LOOP_COMPRESSION_FLAG,
+    FLOW_DEFINITION_VIEW_FLAG
+)
 
 
 def add_node_cache(module_type, node_cache, node_id, log, is_error):
@@ -45,7 +44,7 @@ def add_node_cache(module_type, node_cache, node_id, log, is_error):
     return node_cache
 
 
-def dup_block_sanitize(node_cache, dot, nodes):
+def dup_block_sanitize(node_cache, dot, nodes, contact_id):
     """중복된 모듈 타입 노드들을 하나의 노드로 생성"""
     for key, node_data in node_cache.items():
         node_text, _ = get_node_text_by_module_type(
@@ -64,7 +63,7 @@ def dup_block_sanitize(node_cache, dot, nodes):
         dot.node(
             node_data['id'], label=label,
             shape='box', style='rounded,filled', color=color,
-            URL=str(json.dumps(node_data, indent=4, ensure_ascii=False))
+            URL=put_payload(contact_id, node_data)
         )
         nodes.append(node_data['id'])
     return dot, nodes
@@ -89,62 +88,22 @@ def add_block_nodes(module_type, log, is_error, dot, nodes, node_id, lambda_logs
         shape="plaintext",
         style='rounded,filled',
         color=color,
-        URL=str(json.dumps(log, indent=4, ensure_ascii=False))
+        URL=put_payload(log.get("ContactId"), log)
     )
     nodes.append(node_id)
 
     if module_type == "InvokeExternalResource" and lambda_logs:
-        function_name = get_func_name(log.get("Parameters")["FunctionArn"], env)
         try:
-            function_logs = lambda_logs.get(function_name, [])
-
-            if not isinstance(function_logs, list):
-                raise TypeError(f"Expected list for function_logs, got {type(function_logs).__name__}")
-
             contact_id = log.get("ContactId")
-            log_parameters = (log.get("Parameters") or {}).get("Parameters", [])
-
-            target_logs = []
-            for l in function_logs:
-                if l.get("ContactId") != contact_id:
-                    continue
-                message = l.get("message", "")
-                if "parameter" in message:
-                    func_param = json.dumps(l.get("parameters"), sort_keys=True)
-                    log_param = json.dumps(log_parameters, sort_keys=True)
-                    func_param = func_param.replace("id&v", "idnv")
-                    log_param = log_param.replace("id&v", "idnv")
-                    if log_param == func_param:
-                        target_logs.append(l)
-                elif "Event" in message:
-                    if l.get("event"):
-                        func_param = l["event"]["Details"]["Parameters"]
-                        log_param = log_parameters
-                        if func_param.get('varsConfig') is not None and log_param.get('varsConfig') is not None:
-                            func_param = dict(func_param)
-                            log_param = dict(log_param)
-                            del func_param['varsConfig']
-                            del log_param['varsConfig']
-                        if json.dumps(log_param, sort_keys=True) == json.dumps(func_param, sort_keys=True):
-                            target_logs.append(l)
-
-            xid = ""
-            if len(target_logs) > 1:
-                min_gap = sys.maxsize
-                for l in target_logs:
-                    gap = calculate_timestamp_gap(log.get("Timestamp"), l.get("timestamp"))
-                    if min_gap > gap:
-                        min_gap = gap
-                        xid = l.get("xray_trace_id")
-            elif len(target_logs) == 1:
-                xid = target_logs[0].get("xray_trace_id")
-            else:
-                print(f"===no target logs=== : {log}")
+            function_name, target_log = find_lambda_invocation(log, lambda_logs, env)
 
-            if target_logs:
+            if target_log is not None:
+                xid = target_log.get("xray_trace_id")
                 dot, nodes, error_count = build_xray_dot(
-                    dot, nodes, error_count, xid, region, function_logs, log, module_stack, contact_id
+                    dot, nodes, error_count, xid, region, lambda_logs.trace_index(function_name), log, module_stack, contact_id
                 )
+            else:
+                print(f"===no target logs=== : {log}")
 
         except Exception:
             print(traceback.format_exc())
@@ -152,47 +111,308 @@ def add_block_nodes(module_type, log, is_error, dot, nodes, node_id, lambda_logs
     return dot, nodes, error_count
 
 
-def process_sub_flow(flow_type, dot, nodes, l_nodes, l_name, node_id, l_logs, contact_id, lambda_logs, error_count, env, region, display_name=None):
+def find_lambda_invocation(log, lambda_logs, env):
+    """InvokeExternalResource block 로그에 해당하는 Lambda 함수 이름과 호출 로그 (호출 로그가 없으면 None)"""
+    function_name = get_func_name(log.get("Parameters")["FunctionArn"], env)
+    log_parameters = (log.get("Parameters") or {}).get("Parameters", [])
+    target_log = lambda_logs.invocation_index(function_name).find(log.get("ContactId"), log_parameters, get_epoch_ms(log))
+    return function_name, target_log
+
+
+def count_lambda_errors(logs, lambda_logs, env):
+    """
+    그래프를 만들지 않고 InvokeExternalResource block 에 연결된 Lambda 로그의 Error 수 계산
+    (지연 생성 모드에서 서브 그래프를 만들었다면 build_xray_dot 이 더했을 Error 수)
+    """
+    if not lambda_logs:
+        return 0
+
+    error_count = 0
+    for log in logs:
+        if define_module_type(log.get('ContactFlowModuleType'), log.get("Parameters") or {}) != "InvokeExternalResource":
+            continue
+        try:
+            function_name, target_log = find_lambda_invocation(log, lambda_logs, env)
+        except Exception:
+            print(traceback.format_exc())
+            continue
+        if target_log is not None:
+            trace_logs = lambda_logs.trace_index(function_name).logs(target_log.get("xray_trace_id"))
+            error_count += sum(1 for l in trace_logs if is_error_record(l))
+    return error_count
+
+
+def add_flow_block(dot, nodes, node_cache, last_module_type, log, node_id, is_error, lambda_logs, error_count, module_stack, env, region, contact_id):
+    """block 로그 하나를 그래프에 추가 (연속되는 중복 block 은 캐시 후 하나의 노드로 생성)"""
+    module_type = log.get('ContactFlowModuleType')
+
+    if module_type in DUP_CONTACT_FLOW_MODULE_TYPE:
+        node_cache = add_node_cache(module_type, node_cache, node_id, log, is_error)
+        last_module_type = log.get(module_type)
+    else:
+        if node_cache and module_type != last_module_type:
+            dot, nodes = dup_block_sanitize(node_cache, dot, nodes, contact_id)
+            node_cache = {}
+
+        if module_type not in OMIT_CONTACT_FLOW_MODULE_TYPE:
+            dot, nodes, error_count = add_block_nodes(
+                module_type, log, is_error, dot, nodes, node_id,
+                lambda_logs, error_count, module_stack, env, region
+            )
+
+    return dot, nodes, node_cache, last_module_type, error_count
+
+
+def get_block_segments(logs, break_modules=False):
+    """(index, log) 목록에서 module type, Identifier 가 반복되는 구간을 LoopSegment 로 묶음"""
+    items = list(enumerate(logs))
+    if not LOOP_COMPRESSION_FLAG:
+        return items
+
+    def loop_key(item):
+        log = item[1]
+        # MOD_ 로그는 별도 모듈 노드로 처리하므로 반복 구간에 포함하지 않음
+        if break_modules and "MOD_" in log['ContactFlowName']:
+            return None
+        return log.get('ContactFlowModuleType'), log.get('Identifier')
+
+    return compress_sequence(items, key=loop_key)
+
+
+def get_flow_display_name(info):
+    names = info["contact_flow_names"]
+    return "\n".join(names) if len(names) > 1 else info["contact_flow_name"]
+
+
+def format_loop_time(epoch_ms):
+    return str(format_epoch_ms(epoch_ms)).replace('000+00:00', '')
+
+
+def add_iteration_node(dot, nodes, node_id, number, logs, contact_id):
+    """loop 서브 그래프에서 각 반복의 시작을 표시하는 노드 (반복 구간 로그 전체를 상세 정보로 연결)"""
+    timestamps = [get_epoch_ms(log) for log in logs]
+    iteration_error_count = sum(1 for log in logs if is_error_record(log))
+
+    label = get_node_label(
+        "Loop",
+        f"🔁 #{number}",
+        f"{format_loop_time(min(timestamps))} ~ \n{format_loop_time(max(timestamps))}",
+        f"Nodes : {len(logs)}" + (f"\nErrors: {iteration_error_count}" if iteration_error_count else ""),
+        None
+    )
+    dot.node(
+        node_id, label=label, shape='box', style='rounded,filled',
+        color='tomato' if iteration_error_count else 'lightblue',
+        URL=put_payload(contact_id, {"iteration": number, "logs": logs})
+    )
+    nodes.append(node_id)
+    return dot, nodes
+
+
+def process_loop(loop_type, dot, nodes, node_id, iteration_logs, steps, contact_id, build_loop_graph, module_stack="", lambda_logs=None, env=None):
+    """반복 구간을 반복 횟수, 시간 분포를 표시하는 하나의 노드로 추가 (반복별 상세는 loop 서브 그래프)"""
+    starts = [min(get_epoch_ms(log) for log in logs) for logs in iteration_logs]
+    ends = [max(get_epoch_ms(log) for log in logs) for logs in iteration_logs]
+    intervals = [(starts[i + 1] - starts[i]) / 1000 for i in range(len(starts) - 1)]
+    node_count = sum(len(logs) for logs in iteration_logs)
+
+    sub_file = f"./virtual_env/{loop_type}_loop_{contact_id}_{node_id}{module_stack}"
+    if LAZY_SUBGRAPH_FLAG:
+        # 지연 생성 모드에서는 서브 그래프 없이 block / Lambda 로그 판정 결과로 Error 수 표시
+        loop_logs = [log for logs in iteration_logs for log in logs]
+        loop_error_count = sum(1 for log in loop_logs if is_error_record(log)) + count_lambda_errors(loop_logs, lambda_logs, env)
+        register_lazy_graph(f"{sub_file}.dot", lambda: render_graph(build_loop_graph()[0], sub_file))
+    else:
+        loop_dot, loop_error_count = build_loop_graph()
+        render_graph(loop_dot, sub_file)
+
+    interval_text = ""
+    if intervals:
+        interval_text = f"반복 간격 : 평균 {sum(intervals) / len(intervals):.1f}s ({min(intervals):.1f}s ~ {max(intervals):.1f}s)\n"
+
+    label = get_node_label(
+        "Loop",
+        f"🔁 반복 x{len(iteration_logs)}  ➡️",
+        "\n".join(steps) + f"\n\n{format_loop_time(min(starts))} ~ \n{format_loop_time(max(ends))}",
+        interval_text + f"Nodes : {node_count}" + (f"\nErrors: {loop_error_count}" if loop_error_count else ""),
+        None
+    )
+    dot.node(
+        node_id, label=label, shape='box', style='rounded,filled',
+        color='tomato' if loop_error_count > 0 else 'lightblue',
+        URL=f"{sub_file}.dot"
+    )
+    nodes.append(node_id)
+
+    return dot, nodes, loop_error_count
+
+
+def process_block_loop(dot, nodes, loop, title, lambda_logs, module_stack, env, region, contact_id):
+    """반복되는 block 구간을 하나의 노드로 추가"""
+    index, first_log = loop.items[0]
+    node_id = f"{first_log['Timestamp'].replace(':', '').replace('.', '')}_{index}_loop"
+    iteration_logs = [[log for _, log in iteration] for iteration in loop.iterations]
+
+    steps = []
+    for log in iteration_logs[0]:
+        module_type = log.get('ContactFlowModuleType')
+        if module_type not in OMIT_CONTACT_FLOW_MODULE_TYPE:
+            module_type = define_module_type(module_type, log.get("Parameters") or {})
+            steps.append(get_module_name_ko(module_type, log))
+
+    return process_loop(
+        "module", dot, nodes, node_id, iteration_logs, steps, contact_id,
+        lambda: build_block_loop_detail(loop, title, lambda_logs, module_stack, env, region, contact_id),
+        module_stack, lambda_logs, env
+    )
+
+
+def build_block_loop_detail(loop, title, lambda_logs, module_stack, env, region, contact_id):
+    """반복 구간의 모든 block 을 반복 순서대로 표시하는 그래프를 생성합니다."""
+    l_dot = Digraph(comment=f"Amazon Connect Loop: {title}")
+    l_dot.attr(rankdir="LR", label=f"{title} 🔁 x{loop.repeat}", labelloc="t", fontsize="24")
+
+    nodes = []
+    loop_error_count = 0
+
+    for number, iteration in enumerate(loop.iterations, 1):
+        index, first_log = iteration[0]
+        iteration_id = f"{first_log['Timestamp'].replace(':', '').replace('.', '')}_{index}_iteration"
+        l_dot, nodes = add_iteration_node(l_dot, nodes, iteration_id, number, [log for _, log in iteration], contact_id)
+
+        node_cache = {}
+        last_module_type = ""
+        for index, log in iteration:
+            is_error = is_error_record(log)
+            if is_error:
+                loop_error_count += 1
+
+            node_id = f"{log['Timestamp'].replace(':', '').replace('.', '')}_{index}"
+            l_dot, nodes, node_cache, last_module_type, loop_error_count = add_flow_block(
+                l_dot, nodes, node_cache, last_module_type, log, node_id, is_error,
+                lambda_logs, loop_error_count, module_stack, env, region, contact_id
+            )
+
+        if node_cache:
+            l_dot, nodes = dup_block_sanitize(node_cache, l_dot, nodes, contact_id)
+
+    l_dot = paginate_graph(l_dot, nodes)
+
+    return l_dot, loop_error_count
+
+
+def process_flow_loop(dot, nodes, loop, lambda_logs, contact_id, env, region, flow_names):
+    """메인 흐름에서 반복되는 Flow 구간을 하나의 노드로 추가"""
+    node_id = f"{loop.items[0][0]}_loop"
+    iteration_logs = [[log for _, info in iteration for log in info["subnode"]] for iteration in loop.iterations]
+    steps = [get_flow_display_name(info).replace("\n", " / ") for _, info in loop.iterations[0]]
+
+    return process_loop(
+        "flow", dot, nodes, node_id, iteration_logs, steps, contact_id,
+        lambda: build_flow_loop_detail(loop, lambda_logs, contact_id, env, region, flow_names),
+        lambda_logs=lambda_logs, env=env
+    )
+
+
+def build_flow_loop_detail(loop, lambda_logs, contact_id, env, region, flow_names):
+    """반복 구간의 Flow 들을 반복 순서대로 표시하는 그래프를 생성합니다."""
+    l_dot = Digraph(comment="Amazon Connect Flow Loop")
+    l_dot.attr(rankdir="LR", label=f"🔁 x{loop.repeat}", labelloc="t", fontsize="24")
+
+    nodes = []
+    flow_nodes = {}
+    loop_error_count = 0
+
+    for number, iteration in enumerate(loop.iterations, 1):
+        iteration_id = f"{iteration[0][0]}_iteration"
+        l_dot, nodes = add_iteration_node(
+            l_dot, nodes, iteration_id, number,
+            [log for _, info in iteration for log in info["subnode"]], contact_id
+        )
+
+        for node_id, info in iteration:
+            l_dot, nodes, flow_nodes, error_count = process_sub_flow(
+                "flow", l_dot, nodes, flow_nodes,
+                info['contact_flow_name'], node_id, info["subnode"],
+                contact_id, lambda_logs, 0, env, region,
+                display_name=get_flow_display_name(info), flow_names=flow_names
+            )
+            loop_error_count += error_count
+
+    l_dot = paginate_graph(l_dot, nodes)
+
+    return l_dot, loop_error_count
+
+
+def process_sub_flow(flow_type, dot, nodes, l_nodes, l_name, node_id, l_logs, contact_id, lambda_logs, error_count, env, region, display_name=None, flow_names=None):
     """flow 묶음 처리"""
     if display_name is None:
         display_name = l_name
     min_timestamp, max_timestamp = None, None
     module_error_count = 0
+    verdict_count = 0
 
     for log in l_logs:
-        timestamp = datetime.fromisoformat(log['Timestamp'].replace('Z', '+00:00'))
+        timestamp = get_epoch_ms(log)
         if min_timestamp is None or timestamp < min_timestamp:
             min_timestamp = timestamp
         if max_timestamp is None or timestamp > max_timestamp:
             max_timestamp = timestamp
 
-        if any(keyword in log.get('Results', '') for keyword in ERROR_KEYWORDS):
-            error_count += 1
-        if is_lambda_error(log):
+        if is_error_record(log):
             error_count += 1
+            verdict_count += 1
 
     if flow_type == "module":
-        flow_name = ""
-        with open(f"./virtual_env/contact_flow_{contact_id}.json") as f:
-            flow_logs = json.loads(f.read())
-
-        flow_arn_list = [l for l in flow_logs if l.get("ContactFlowId") == log['ModuleExecutionStack'][1]]
-        if flow_arn_list:
-            flow_name = flow_arn_list[0].get("ContactFlowName")
+        flow_name = (flow_names or {}).get(l_logs[-1]['ModuleExecutionStack'][1], "")
 
         module_stack = f"__{flow_name}__{l_name}"
-        sub_dot, _, module_error_count = build_module_detail(l_logs, l_name, lambda_logs, module_error_count, module_stack, env, region)
         node_title = "InvokeFlowModule"
-        error_count += module_error_count
         sub_file = f"./virtual_env/{flow_type}_{contact_id}{module_stack}"
 
+        definition_dot = None
+        if FLOW_DEFINITION_VIEW_FLAG:
+            definition_dot = build_definition_overlay(l_logs, l_logs[-1].get('ContactFlowId'), l_name, contact_id)
+
+        if definition_dot is not None:
+            # Flow 정의 모드에서는 block 판정 결과로만 Error 수 표시
+            module_error_count = verdict_count
+            sub_file = f"./virtual_env/{flow_type}_definition_{contact_id}{module_stack}"
+            render_graph(definition_dot, sub_file)
+        elif LAZY_SUBGRAPH_FLAG:
+            # 지연 생성 모드에서는 서브 그래프 없이 block / Lambda 로그 판정 결과로 Error 수 표시
+            lambda_error_count = count_lambda_errors(l_logs, lambda_logs, env)
+            module_error_count = verdict_count + lambda_error_count
+            error_count += lambda_error_count
+            register_lazy_graph(f"{sub_file}.dot", lambda: render_graph(
+                build_module_detail(l_logs, l_name, lambda_logs, 0, module_stack, env, region, contact_id)[0], sub_file
+            ))
+        else:
+            sub_dot, _, module_error_count = build_module_detail(l_logs, l_name, lambda_logs, module_error_count, module_stack, env, region, contact_id)
+            error_count += module_error_count
+            render_graph(sub_dot, sub_file)
+
     elif flow_type == "flow":
         module_stack = f"__{l_name}"
-        sub_dot, error_count = build_contact_flow_detail(l_logs, display_name, contact_id, lambda_logs, error_count, module_stack, env, region)
         node_title = "TransferToFlow"
         sub_file = f"./virtual_env/{flow_type}_{contact_id}_{node_id}{module_stack}"
 
-    sub_dot.render(sub_file, format="dot", cleanup=True)
+        definition_dot = None
+        if FLOW_DEFINITION_VIEW_FLAG:
+            flow_log = next((log for log in l_logs if "MOD_" not in log['ContactFlowName']), l_logs[0])
+            definition_dot = build_definition_overlay(l_logs, flow_log.get('ContactFlowId'), l_name, contact_id)
+
+        if definition_dot is not None:
+            sub_file = f"./virtual_env/{flow_type}_definition_{contact_id}_{node_id}{module_stack}"
+            render_graph(definition_dot, sub_file)
+        elif LAZY_SUBGRAPH_FLAG:
+            error_count += count_lambda_errors(l_logs, lambda_logs, env)
+            register_lazy_graph(f"{sub_file}.dot", lambda: render_graph(
+                build_contact_flow_detail(l_logs, display_name, contact_id, lambda_logs, 0, module_stack, env, region, flow_names)[0], sub_file
+            ))
+        else:
+            sub_dot, error_count = build_contact_flow_detail(l_logs, display_name, contact_id, lambda_logs, error_count, module_stack, env, region, flow_names)
+            render_graph(sub_dot, sub_file)
 
     l_nodes[l_name] = node_id
 
@@ -206,7 +426,7 @@ def process_sub_flow(flow_type, dot, nodes, l_nodes, l_name, node_id, l_logs, co
     l_label = get_node_label(
         node_title,
         f"{display_name.replace(chr(10), '<br/>')}  ➡️",
-        f"{str(min_timestamp).replace('000+00:00', '')} ~ \n{str(max_timestamp).replace('000+00:00', '')}",
+        f"{str(format_epoch_ms(min_timestamp)).replace('000+00:00', '')} ~ \n{str(format_epoch_ms(max_timestamp)).replace('000+00:00', '')}",
         f"Nodes : {len(l_logs)}\n" + error_count_text,
         None
     )
@@ -217,87 +437,88 @@ def process_sub_flow(flow_type, dot, nodes, l_nodes, l_name, node_id, l_logs, co
     return dot, nodes, l_nodes, error_count
 
 
-def build_module_detail(logs, module_name, lambda_logs, module_error_count, module_stack, env, region):
+def build_module_detail(logs, module_name, lambda_logs, module_error_count, module_stack, env, region, contact_id):
     """MOD_로 시작하는 모듈의 세부 정보를 시각화하는 그래프를 생성합니다."""
     m_dot = Digraph(comment=f"Amazon Connect Module: {module_name}")
     m_dot.attr(rankdir="LR", label=module_name, labelloc="t", fontsize="24")
 
-    logs.sort(key=lambda x: datetime.fromisoformat(x['Timestamp'].replace('Z', '+00:00')))
+    logs.sort(key=get_epoch_ms)
     nodes = []
     node_cache = {}
     last_module_type = ""
 
-    for index, log in enumerate(logs):
-        is_error = any(keyword in log.get('Results', '') for keyword in ERROR_KEYWORDS) or is_lambda_error(log)
+    for segment in get_block_segments(logs):
+        if isinstance(segment, LoopSegment):
+            if node_cache:
+                m_dot, nodes = dup_block_sanitize(node_cache, m_dot, nodes, contact_id)
+                node_cache = {}
+            m_dot, nodes, loop_error_count = process_block_loop(
+                m_dot, nodes, segment, module_name, lambda_logs, module_stack, env, region, contact_id
+            )
+            module_error_count += loop_error_count
+            continue
+
+        index, log = segment
+        is_error = is_error_record(log)
         if is_error:
             module_error_count += 1
 
         node_id = f"{log['Timestamp'].replace(':', '').replace('.', '')}_{index}"
-        module_type = log.get('ContactFlowModuleType')
-
-        if module_type in DUP_CONTACT_FLOW_MODULE_TYPE:
-            node_cache = add_node_cache(module_type, node_cache, node_id, log, is_error)
-            last_module_type = log.get(module_type)
-        else:
-            if node_cache and module_type != last_module_type:
-                m_dot, nodes = dup_block_sanitize(node_cache, m_dot, nodes)
-                node_cache = {}
-
-            if module_type not in OMIT_CONTACT_FLOW_MODULE_TYPE:
-                m_dot, nodes, module_error_count = add_block_nodes(
-                    module_type, log, is_error, m_dot, nodes, node_id,
-                    lambda_logs, module_error_count, module_stack, env, region
-                )
+        m_dot, nodes, node_cache, last_module_type, module_error_count = add_flow_block(
+            m_dot, nodes, node_cache, last_module_type, log, node_id, is_error,
+            lambda_logs, module_error_count, module_stack, env, region, contact_id
+        )
 
-    m_dot = add_edges(m_dot, nodes)
-    apply_rank(m_dot, nodes)
+    m_dot = paginate_graph(m_dot, nodes)
 
     return m_dot, nodes, module_error_count
 
 
-def build_contact_flow_detail(logs, flow_name, contact_id, lambda_logs, error_count, module_stack, env, region):
+def build_contact_flow_detail(logs, flow_name, contact_id, lambda_logs, error_count, module_stack, env, region, flow_names=None):
     """Contact Detail 흐름을 시각화하고 MOD_ 모듈에 대한 세부 그래프를 추가 생성합니다."""
     dot = Digraph(comment="Amazon Connect Contact Flow")
     dot.attr(rankdir="LR", label=flow_name, labelloc="t", fontsize="24")
 
-    logs.sort(key=lambda x: datetime.fromisoformat(x['Timestamp'].replace('Z', '+00:00')))
+    logs.sort(key=get_epoch_ms)
+    flow_groups, _ = group_logs_by_flow(logs)
     nodes = []
     module_nodes = {}
     node_cache = {}
     last_module_type = ""
 
-    for index, log in enumerate(logs):
-        is_error = any(keyword in log.get('Results', '') for keyword in ERROR_KEYWORDS) or is_lambda_error(log)
+    for segment in get_block_segments(logs, break_modules=True):
+        if isinstance(segment, LoopSegment):
+            if node_cache:
+                dot, nodes = dup_block_sanitize(node_cache, dot, nodes, contact_id)
+                node_cache = {}
+            dot, nodes, loop_error_count = process_block_loop(
+                dot, nodes, segment, flow_name, lambda_logs, module_stack, env, region, contact_id
+            )
+            # block 판정 Error 는 process_sub_flow 에서 이미 더했으므로 Lambda / X-Ray Error 만 더함
+            error_count += loop_error_count - sum(1 for _, log in segment.items if is_error_record(log))
+            continue
+
+        index, log = segment
+        is_error = is_error_record(log)
         node_id = f"{log['Timestamp'].replace(':', '').replace('.', '')}_{index}"
-        module_type = log.get('ContactFlowModuleType')
 
         if "MOD_" in log['ContactFlowName']:
             module_name = log['ContactFlowName']
             if module_name not in module_nodes:
-                module_logs = [l for l in logs if l['ContactFlowName'] == module_name]
                 dot, nodes, module_nodes, error_count = process_sub_flow(
                     "module", dot, nodes, module_nodes, module_name, node_id,
-                    module_logs, contact_id, lambda_logs, error_count, env, region
+                    flow_groups[module_name], contact_id, lambda_logs, error_count, env, region,
+                    flow_names=flow_names
                 )
             else:
                 node_id = module_nodes[module_name]
         else:
-            if module_type in DUP_CONTACT_FLOW_MODULE_TYPE:
-                node_cache = add_node_cache(module_type, node_cache, node_id, log, is_error)
-                last_module_type = log.get(module_type)
-            else:
-                if node_cache and module_type != last_module_type:
-                    dot, nodes = dup_block_sanitize(node_cache, dot, nodes)
-                    node_cache = {}
+            dot, nodes, node_cache, last_module_type, error_count = add_flow_block(
+                dot, nodes, node_cache, last_module_type, log, node_id, is_error,
+                lambda_logs, error_count, module_stack, env, region, contact_id
+            )
 
-                if module_type not in OMIT_CONTACT_FLOW_MODULE_TYPE:
-                    dot, nodes, error_count = add_block_nodes(
-                        module_type, log, is_error, dot, nodes, node_id,
-                        lambda_logs, error_count, module_stack, env, region
-                    )
-
-    dot = add_edges(dot, nodes)
-    apply_rank(dot, nodes)
+    dot = paginate_graph(dot, nodes)
 
     return dot, error_count
 
@@ -307,7 +528,10 @@ def build_main_flow(logs, lambda_logs, contact_id, env, region):
     main_flow_dot = Digraph(comment="Amazon Connect Contact Flow")
     main_flow_dot.attr(rankdir="LR")
 
-    logs.sort(key=lambda x: datetime.fromisoformat(x['Timestamp'].replace('Z', '+00:00')))
+    # 모든 서브 그래프가 같은 Lambda 로그 묶음을 공유하여 함수별 인덱스는 한 번만 생성
+    lambda_logs = as_lambda_logs(lambda_logs)
+    logs.sort(key=get_epoch_ms)
+    _, flow_names = group_logs_by_flow(logs)
     nodes = []
     flow_nodes = {}
 
@@ -323,18 +547,28 @@ def build_main_flow(logs, lambda_logs, contact_id, env, region):
                 node_info[node_id]["contact_flow_name"] = flow_name
         node_info[node_id]["subnode"].append(log)
 
-    for node_id, info in node_info.items():
+    entries = list(node_info.items())
+    if LOOP_COMPRESSION_FLAG:
+        entries = compress_sequence(entries, key=lambda entry: tuple(entry[1]["contact_flow_names"]) or None)
+
+    for segment in entries:
+        if isinstance(segment, LoopSegment):
+            main_flow_dot, nodes, _ = process_flow_loop(
+                main_flow_dot, nodes, segment, lambda_logs, contact_id, env, region, flow_names
+            )
+            continue
+
+        node_id, info = segment
         error_count = 0
-        names = info["contact_flow_names"]
-        display_name = "\n".join(names) if len(names) > 1 else info["contact_flow_name"]
         main_flow_dot, nodes, flow_nodes, error_count = process_sub_flow(
             "flow", main_flow_dot, nodes, flow_nodes,
             info['contact_flow_name'], node_id, info["subnode"],
             contact_id, lambda_logs, error_count, env, region,
-            display_name=display_name
+            display_name=get_flow_display_name(info), flow_names=flow_names
         )
 
     main_flow_dot = add_edges(main_flow_dot, nodes)
-    apply_rank(main_flow_dot, nodes)
+    # 메인 그래프는 Contact 별 cluster 로 바깥 neato 그래프에 포함되므로 point 단위 격자 좌표를 고정하지 않음
+    apply_rank(main_flow_dot, nodes, grid=False)
 
     return main_flow_dot, nodes
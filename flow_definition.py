@@ -0,0 +1,155 @@
+import json
+import hashlib
+import threading
+from collections import Counter
+
+import graphviz
+from graphviz import Digraph
+
+from describe_flow import get_describe_path
+from artifact_bus import get_artifact
+from layout_cache import collect_graph, extract_layout, apply_layout, save_layout, load_layout
+from timestamps import get_epoch_ms
+from error_rules import is_error
+from node_store import put_payload
+from utils import valid_uuid, wrap_text
+
+FLOW_LAYOUT_DIRECTORY = "./virtual_env/flow_layout"
+
+# 실행 정보 줄은 항상 같은 글자 수로 표시하여 정적 레이아웃과 label 크기를 맞춤
+EXECUTION_LINE_FORMAT = "실행 {count:>4}회 · Error {errors:>3}"
+
+_layout_locks = {}
+_layout_locks_lock = threading.Lock()
+
+
+def load_flow_definition(contact_flow_id):
+    path = get_describe_path(contact_flow_id)
+    if not path:
+        return None
+    return get_artifact(path)
+
+
+def get_flow_version(definition):
+    """Flow 정의 내용 hash (정의가 바뀌면 레이아웃을 다시 계산)"""
+    text = json.dumps(definition, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def get_transitions(action):
+    """action 의 (다음 action, 종류, label) 목록 (정의 순서)"""
+    transitions = action.get("Transitions") or {}
+    result = []
+    if transitions.get("NextAction"):
+        result.append((transitions["NextAction"], "next", ""))
+    for condition in transitions.get("Conditions") or []:
+        operands = (condition.get("Condition") or {}).get("Operands") or []
+        result.append((condition.get("NextAction"), "condition", wrap_text(" ".join(map(str, operands)), is_just_cut=True, max_length=20)))
+    for error in transitions.get("Errors") or []:
+        result.append((error.get("NextAction"), "error", error.get("ErrorType", "")))
+    return result
+
+
+def build_definition_graph(definition, flow_name, executions=None, taken=None, contact_id=None):
+    """
+    Flow 정의의 Actions / Transitions 그래프 생성
+    executions, taken 이 없으면 정적 레이아웃 계산용, 있으면 실행 결과를 스타일로 표시 (구조와 label 크기는 동일)
+    """
+    dot = Digraph(comment=f"Amazon Connect Flow Definition: {flow_name}")
+    dot.attr(rankdir="TB", label=flow_name, labelloc="t", fontsize="24", nodesep="0.4", ranksep="0.5")
+
+    actions = definition.get("Actions") or []
+    action_ids = {action.get("Identifier") for action in actions}
+    start_action = definition.get("StartAction")
+
+    for action in actions:
+        action_id = action.get("Identifier")
+        logs = (executions or {}).get(action_id, [])
+        error_count = sum(1 for log in logs if is_error(log))
+
+        title = action.get("Type", "")
+        if action_id == start_action:
+            title = f"▶ {title}"
+        block_name = "" if valid_uuid(action_id) else f"\n{wrap_text(action_id, is_just_cut=True, max_length=30)}"
+        label = f"{title}{block_name}\n{EXECUTION_LINE_FORMAT.format(count=len(logs), errors=error_count)}"
+
+        attrs = {"shape": "box", "style": "rounded,filled"}
+        if executions is None:
+            attrs["color"] = "lightgray"
+        elif not logs:
+            attrs.update(style="rounded,dashed", color="gray", fontcolor="gray")
+        else:
+            attrs["color"] = "tomato" if error_count else "lightblue"
+            attrs["penwidth"] = "2"
+        if contact_id:
+            attrs["URL"] = put_payload(contact_id, {"action": action, "executions": logs})
+
+        dot.node(action_id, label=label, **attrs)
+
+    for action in actions:
+        action_id = action.get("Identifier")
+        for next_action, kind, text in get_transitions(action):
+            if next_action not in action_ids:
+                continue
+            attrs = {"label": text} if text else {}
+            if kind == "error":
+                attrs["style"] = "dashed"
+            if taken is not None:
+                count = taken.get((action_id, next_action), 0)
+                if count:
+                    attrs.update(color="blue", penwidth="2.5")
+                else:
+                    attrs.update(color="gray")
+            dot.edge(action_id, next_action, **attrs)
+
+    return dot
+
+
+def get_definition_layout(definition, flow_name):
+    """Flow 정의 버전별 정적 레이아웃 (처음 한 번만 Graphviz 로 계산하고 파일로 cache)"""
+    version = get_flow_version(definition)
+    path = f"{FLOW_LAYOUT_DIRECTORY}/{version}.json"
+
+    with _layout_locks_lock:
+        lock = _layout_locks.setdefault(version, threading.Lock())
+
+    with lock:
+        layout = load_layout(path)
+        if layout is not None:
+            return layout
+
+        base_dot = build_definition_graph(definition, flow_name)
+        xdotcode = graphviz.Source(base_dot.source, engine="dot").pipe(format="xdot")
+        layout = extract_layout(collect_graph(base_dot.source.encode("utf-8")), xdotcode)
+        if layout is not None:
+            save_layout(path, layout)
+        return layout
+
+
+def build_definition_overlay(logs, contact_flow_id, flow_name, contact_id):
+    """
+    Contact 의 실행 block, 실행된 전이, block 별 실행 / Error 수를 Flow 정의 레이아웃 위에 표시한 그래프 반환
+    정의 파일이 없거나 레이아웃을 만들 수 없으면 None
+    """
+    definition = load_flow_definition(contact_flow_id)
+    if not definition or not definition.get("Actions"):
+        return None
+
+    try:
+        layout = get_definition_layout(definition, flow_name)
+    except Exception as e:
+        print(f"Error building flow definition layout {contact_flow_id}: {e}")
+        return None
+    if layout is None:
+        return None
+
+    flow_logs = sorted((log for log in logs if log.get("ContactFlowId") == contact_flow_id), key=get_epoch_ms)
+    executions = {}
+    for log in flow_logs:
+        executions.setdefault(log.get("Identifier"), []).append(log)
+    taken = Counter(
+        (prev.get("Identifier"), cur.get("Identifier")) for prev, cur in zip(flow_logs, flow_logs[1:])
+    )
+
+    overlay_dot = build_definition_graph(definition, flow_name, executions, taken, contact_id)
+    return apply_layout(overlay_dot, collect_graph(overlay_dot.source.encode("utf-8")), layout)
@@ -0,0 +1,72 @@
+from graphviz import Digraph
+
+from utils import apply_rank
+from graph_labels import add_edges
+from grid_layout import get_statement_node_id
+from constants import GRAPH_NODE_BUDGET
+
+# 이전/다음 페이지 이동 노드의 URL prefix (같은 창에서 페이지 전환)
+PAGE_REF_PREFIX = "page:"
+
+
+def is_page_ref(url):
+    return isinstance(url, str) and url.startswith(PAGE_REF_PREFIX)
+
+
+def get_page_number(ref):
+    return int(ref[len(PAGE_REF_PREFIX):])
+
+
+def add_page_node(dot, nodes, node_id, page, page_count, is_next):
+    text = f"다음 ▶\n{page} / {page_count}" if is_next else f"◀ 이전\n{page} / {page_count}"
+    dot.node(node_id, label=text, shape="box", style="rounded,filled", color="lightblue", URL=f"{PAGE_REF_PREFIX}{page}")
+    nodes.append(node_id)
+
+
+def paginate_graph(dot, nodes, node_budget=GRAPH_NODE_BUDGET):
+    """
+    edge, rank 를 적용한 그래프 반환
+    노드 수가 node_budget 을 넘으면 순서대로 페이지 그래프를 나누어 dot.pages 에 저장 (render_graph 에서 페이지별 render)
+    """
+    if not node_budget or len(nodes) <= node_budget:
+        dot = add_edges(dot, nodes)
+        apply_rank(dot, nodes)
+        return dot
+
+    # node 선언은 node 별로, 나머지(그래프 속성) 는 모든 페이지에 복사
+    common_body = []
+    node_statements = {}
+    for statement in dot.body:
+        node_id = get_statement_node_id(statement)
+        if node_id is None:
+            common_body.append(statement)
+        else:
+            node_statements.setdefault(node_id, []).append(statement)
+
+    page_count = (len(nodes) + node_budget - 1) // node_budget
+    pages = []
+    for page in range(1, page_count + 1):
+        page_nodes = nodes[(page - 1) * node_budget:page * node_budget]
+
+        page_dot = Digraph(comment=dot.comment)
+        page_dot.body.extend(common_body)
+
+        ranked_nodes = []
+        if page > 1:
+            add_page_node(page_dot, ranked_nodes, f"page_{page}_prev", page - 1, page_count, is_next=False)
+        for node_id in dict.fromkeys(page_nodes):
+            page_dot.body.extend(node_statements.get(node_id, []))
+        ranked_nodes.extend(page_nodes)
+        if page < page_count:
+            add_page_node(page_dot, ranked_nodes, f"page_{page}_next", page + 1, page_count, is_next=True)
+
+        page_dot = add_edges(page_dot, ranked_nodes)
+        apply_rank(page_dot, ranked_nodes)
+        pages.append(page_dot)
+
+    # nodes 목록에 없는 node 는 첫 페이지에 표시
+    for node_id in node_statements.keys() - set(nodes):
+        pages[0].body.extend(node_statements[node_id])
+
+    dot.pages = pages
+    return dot
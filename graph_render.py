@@ -0,0 +1,346 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import graphviz
+
+import constants
+from log_record import json_default
+from layout_cache import LayoutCache
+from constants import INCREMENTAL_RENDER_FLAG, INCREMENTAL_BUILD_FLAG, LAZY_SUBGRAPH_FLAG, \
+    GRAPH_BUILDER_VERSION, LAYOUT_CACHE_FLAG, GRAPHVIZ_MAX_WORKERS
+
+# xdot 출력 여부 판별 (graph 속성에 xdotversion 포함)
+XDOT_VERSION_PATTERN = re.compile(rb'xdotversion\s*=')
+
+# xdot 판별 시 확인할 파일 앞부분 크기
+XDOT_HEADER_SIZE = 65536
+
+# 동시에 실행할 Graphviz 프로세스 수
+RENDER_MAX_WORKERS = GRAPHVIZ_MAX_WORKERS
+
+# render 결과 파일별 입력 hash 기록
+RENDER_MANIFEST_PATH = "./virtual_env/render_manifest.json"
+
+# builder 별 입력 hash, render 한 파일 목록, 결과 기록
+BUILD_MANIFEST_PATH = "./virtual_env/build_manifest.json"
+
+
+def is_xdot(dotcode):
+    """레이아웃이 이미 계산된 xdot 코드인지 확인"""
+    return XDOT_VERSION_PATTERN.search(dotcode[:XDOT_HEADER_SIZE]) is not None
+
+
+def render_hash(source, engine, neato_no_op=None):
+    """builder 버전, layout engine 옵션, DOT source 로 render 입력 hash 계산"""
+    digest = hashlib.sha1(f"{GRAPH_BUILDER_VERSION}\0{engine}\0{neato_no_op or 0}\0".encode("utf-8"))
+    digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_hash(inputs):
+    """builder 입력과 설정(constants 의 대문자 상수, GRAPH_BUILDER_VERSION 포함)으로 hash 계산"""
+    settings = {key: value for key, value in vars(constants).items() if key.isupper()}
+    digest = hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(json.dumps(inputs, ensure_ascii=False, default=json_default).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_json(path, value, **kwargs):
+    """같은 디렉터리의 고유한 임시 파일에 저장한 뒤 교체 (다른 저장과 임시 파일이 겹치지 않음)"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, **kwargs)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class RenderManifest:
+    """render 결과 파일 경로 → 입력 hash 목록 (같은 hash 면 render 생략)"""
+
+    def __init__(self, path=RENDER_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._by_hash = {digest: output_path for output_path, digest in self._entries.items()}
+        self._dirty = False
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading render manifest {self.path}: {e}")
+            return {}
+
+    def is_fresh(self, output_path, digest):
+        """기존 render 결과를 그대로 쓸 수 있는지 확인"""
+        with self._lock:
+            return self._entries.get(output_path) == digest and os.path.isfile(output_path)
+
+    def find_same(self, digest):
+        """같은 입력으로 render 된 다른 파일 경로 반환 (없으면 None)"""
+        with self._lock:
+            output_path = self._by_hash.get(digest)
+            if output_path and self._entries.get(output_path) == digest and os.path.isfile(output_path):
+                return output_path
+        return None
+
+    def record(self, output_path, digest):
+        with self._lock:
+            previous = self._entries.get(output_path)
+            if previous == digest:
+                return
+            if previous and self._by_hash.get(previous) == output_path:
+                del self._by_hash[previous]
+            self._entries[output_path] = digest
+            self._by_hash[digest] = output_path
+            self._dirty = True
+
+    def discard(self, output_path):
+        with self._lock:
+            digest = self._entries.pop(output_path, None)
+            if digest and self._by_hash.get(digest) == output_path:
+                del self._by_hash[digest]
+            self._dirty = digest is not None or self._dirty
+
+    def save(self):
+        # 동시에 저장해도 마지막 상태가 남도록 lock 안에서 파일 교체
+        with self._lock:
+            if not self._dirty:
+                return
+            _write_json(self.path, self._entries)
+            self._dirty = False
+
+
+class BuildCache:
+    """builder 이름 → 입력 hash, render 한 파일 목록, 결과 (hash 가 같고 파일이 남아 있으면 builder 생략)"""
+
+    def __init__(self, path=BUILD_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = False
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading build manifest {self.path}: {e}")
+            return {}
+
+    def lookup(self, key, digest):
+        """재사용할 수 있는 기록 반환 (없으면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry["hash"] == digest and all(os.path.isfile(path) for path in entry["files"]):
+            return entry
+        return None
+
+    def record(self, key, digest, files, output):
+        with self._lock:
+            self._entries[key] = {"hash": digest, "files": sorted(set(files)), "output": output}
+            self._dirty = True
+
+    def save(self, failed=()):
+        """render 에 실패한 파일을 포함하는 기록은 제외하고 저장"""
+        failed = set(failed)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if failed.intersection(entry["files"])]:
+                del self._entries[key]
+                self._dirty = True
+            if not self._dirty:
+                return
+            _write_json(self.path, self._entries, ensure_ascii=False)
+            self._dirty = False
+
+
+def _render_source(source, engine, output_path, neato_no_op=None):
+    """DOT source 를 Graphviz 로 한 번 레이아웃하여 xdot 으로 저장 (neato_no_op 이면 node pos 그대로 사용)"""
+    xdotcode = graphviz.Source(source, engine=engine).pipe(format="xdot", neato_no_op=neato_no_op)
+    with open(output_path, "wb") as f:
+        f.write(xdotcode)
+    return xdotcode
+
+
+def _render_dot(dot, output_path, neato_no_op, layout_cache):
+    """같은 구조의 레이아웃이 cache 에 있으면 좌표를 재사용하여 render, 없으면 render 후 좌표 저장"""
+    # 좌표가 입력으로 지정된 그래프 (neato -n / -n2) 는 레이아웃 cache 대상이 아님
+    if layout_cache is None or neato_no_op:
+        _render_source(dot.source, dot.engine, output_path, neato_no_op)
+        return output_path
+
+    source, engine, neato_no_op, on_rendered = layout_cache.prepare(dot, neato_no_op)
+    xdotcode = _render_source(source, engine, output_path, neato_no_op)
+    if on_rendered is not None:
+        try:
+            on_rendered(xdotcode)
+        except Exception as e:
+            print(f"Error storing layout cache for {output_path}: {e}")
+    return output_path
+
+
+def _render_incremental(dot, output_path, neato_no_op, layout_cache, digest, manifest):
+    """같은 입력으로 render 된 파일이 있으면 복사, 없으면 render 후 manifest 에 기록"""
+    same_path = manifest.find_same(digest)
+    if same_path:
+        shutil.copyfile(same_path, output_path)
+    else:
+        manifest.discard(output_path)
+        _render_dot(dot, output_path, neato_no_op, layout_cache)
+    manifest.record(output_path, digest)
+    return output_path
+
+
+class RenderScheduler:
+    """builder 들의 render 작업을 모아 Graphviz 프로세스를 병렬로 실행하는 queue"""
+
+    def __init__(self, max_workers=RENDER_MAX_WORKERS, incremental=INCREMENTAL_RENDER_FLAG, layout_cache=LAYOUT_CACHE_FLAG):
+        self.max_workers = max_workers
+        self.incremental = incremental
+        self.layout_cache = LayoutCache() if layout_cache else None
+        self._manifest = None
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._recording = threading.local()
+
+    @contextmanager
+    def record_outputs(self):
+        """이 thread 에서 등록한 render 결과 파일 경로 수집"""
+        previous = getattr(self._recording, "files", None)
+        files = self._recording.files = []
+        try:
+            yield files
+        finally:
+            self._recording.files = previous
+            if previous is not None:
+                previous.extend(files)
+
+    @property
+    def manifest(self):
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = RenderManifest()
+            return self._manifest
+
+    def submit(self, dot, file_path):
+        """render 작업을 등록하고 결과 파일 경로를 바로 반환 (입력이 바뀌지 않았으면 생략)"""
+        output_path = f"{file_path}.dot"
+        recorded = getattr(self._recording, "files", None)
+        if recorded is not None:
+            recorded.append(output_path)
+        source = dot.source
+        # apply_rank 격자 배치처럼 좌표가 이미 계산된 그래프는 neato -n 으로 render
+        neato_no_op = getattr(dot, "neato_no_op", None)
+
+        if self.incremental:
+            manifest = self.manifest
+            digest = render_hash(source, dot.engine, neato_no_op)
+            if manifest.is_fresh(output_path, digest):
+                return output_path
+            task = (_render_incremental, dot, output_path, neato_no_op, self.layout_cache, digest, manifest)
+        else:
+            task = (_render_dot, dot, output_path, neato_no_op, self.layout_cache)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            future = self._executor.submit(*task)
+            self._futures[future] = output_path
+        return output_path
+
+    def wait(self):
+        """등록된 모든 render 작업이 끝날 때까지 대기하고 실패한 파일 경로 목록 반환"""
+        # 다른 thread 가 동시에 기다리는 작업도 모두 끝날 때까지 대기 (완료된 작업만 제거)
+        with self._lock:
+            futures = dict(self._futures)
+        wait(futures)
+        with self._lock:
+            for future in futures:
+                self._futures.pop(future, None)
+
+        failed = []
+        for future, output_path in futures.items():
+            error = future.exception()
+            if error is not None:
+                print(f"Error rendering {output_path}: {error}")
+                failed.append(output_path)
+
+        if self.incremental:
+            self.manifest.save()
+        return failed
+
+
+default_scheduler = RenderScheduler()
+
+_build_cache = None
+_build_cache_lock = threading.Lock()
+
+
+def get_build_cache():
+    global _build_cache
+    with _build_cache_lock:
+        if _build_cache is None:
+            _build_cache = BuildCache()
+        return _build_cache
+
+
+def cached_build(key, get_inputs, build, dump=None, load=None):
+    """
+    get_inputs() 의 hash 가 이전 실행과 같고 그때 render 한 파일이 남아 있으면 기록된 결과를 반환하고 build 생략
+    dump / load : 결과 ↔ JSON 변환 (지연 생성 모드에서는 항상 build)
+    """
+    if not INCREMENTAL_BUILD_FLAG or LAZY_SUBGRAPH_FLAG:
+        return build()
+
+    cache = get_build_cache()
+    digest = build_hash(get_inputs())
+    entry = cache.lookup(key, digest)
+    if entry is not None:
+        return load(entry["output"]) if load else entry["output"]
+
+    with default_scheduler.record_outputs() as files:
+        output = build()
+    cache.record(key, digest, files, dump(output) if dump else output)
+    return output
+
+
+def get_page_file_path(file_path, page):
+    """페이지 그래프 파일 경로 (첫 페이지는 원래 경로)"""
+    return file_path if page == 1 else f"{file_path}_p{page}"
+
+
+def render_graph(dot, file_path):
+    """render 작업을 병렬 queue 에 등록 ({file_path}.dot 에 xdot 으로 저장, 페이지로 나뉜 그래프는 페이지별 파일)"""
+    pages = getattr(dot, "pages", None)
+    if pages:
+        for page, page_dot in enumerate(pages, 1):
+            default_scheduler.submit(page_dot, get_page_file_path(file_path, page))
+        return f"{file_path}.dot"
+    return default_scheduler.submit(dot, file_path)
+
+
+def wait_for_renders():
+    """메인 창을 열기 전 모든 render 작업 완료 대기 (builder 기록은 render 결과와 함께 저장)"""
+    failed = default_scheduler.wait()
+    if _build_cache is not None:
+        _build_cache.save(failed)
+    return failed
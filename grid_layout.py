@@ -0,0 +1,158 @@
+import re
+import html
+import unicodedata
+
+# DOT body 에서 node 선언의 ID 추출 (edge / graph 속성 선언 제외)
+NODE_STATEMENT_PATTERN = re.compile(r'^\s*("(?:[^"\\]|\\.)*"|[^\s\[\-"=]+)\s*(?:\[|$)')
+NON_NODE_KEYWORDS = frozenset(("graph", "node", "edge", "subgraph"))
+
+HTML_ROW_PATTERN = re.compile(r"<tr[^>]*>(.*?)</tr>", re.S | re.I)
+HTML_CELL_PATTERN = re.compile(r"<td([^>]*)>(.*?)</td>", re.S | re.I)
+HTML_WIDTH_PATTERN = re.compile(r'\bwidth="(\d+)"', re.I)
+HTML_HEIGHT_PATTERN = re.compile(r'\bheight="(\d+)"', re.I)
+HTML_BREAK_PATTERN = re.compile(r"<br\s*/?>", re.I)
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+LABEL_ATTR_PATTERN = re.compile(r'\blabel=(<.*>|"(?:[^"\\]|\\.)*"|\S+?)(?=\s+\w+=|\]\s*$)', re.S)
+
+# 기본 글꼴(14pt) 기준 글자 폭 / 줄 높이 (point)
+ASCII_CHAR_WIDTH = 7.5
+WIDE_CHAR_WIDTH = 14.0
+LINE_HEIGHT = 17.0
+
+# node 외곽 여백 (point)
+NODE_PADDING_X = 24.0
+NODE_PADDING_Y = 16.0
+
+# 격자 칸 사이 간격 (edge label 표시 공간 포함, point)
+GRID_COL_GAP = 60.0
+GRID_ROW_GAP = 40.0
+
+
+def _unquote(node_id):
+    if node_id.startswith('"') and node_id.endswith('"'):
+        return node_id[1:-1].replace('\\"', '"')
+    return node_id
+
+
+def _text_width(text):
+    width = 0.0
+    for char in text:
+        if unicodedata.east_asian_width(char) in ("W", "F") or ord(char) > 0xFFFF:
+            width += WIDE_CHAR_WIDTH
+        else:
+            width += ASCII_CHAR_WIDTH
+    return width
+
+
+def _plain_lines(text):
+    return [html.unescape(HTML_TAG_PATTERN.sub("", line)) for line in HTML_BREAK_PATTERN.split(text)]
+
+
+def estimate_html_label_size(label):
+    """HTML table label 의 크기 추정 (행별 텍스트 줄 수, 셀 width/height 속성 기준)"""
+    width, height = 0.0, 0.0
+    for row in HTML_ROW_PATTERN.findall(label):
+        row_width, row_height = 0.0, 0.0
+        for attrs, content in HTML_CELL_PATTERN.findall(row):
+            lines = _plain_lines(content)
+            cell_width = max((_text_width(line) for line in lines), default=0.0)
+            cell_height = LINE_HEIGHT * max(len(lines), 1)
+
+            fixed_width = HTML_WIDTH_PATTERN.search(attrs)
+            fixed_height = HTML_HEIGHT_PATTERN.search(attrs)
+            if fixed_width:
+                cell_width = max(cell_width, float(fixed_width.group(1)))
+            if fixed_height:
+                cell_height = max(cell_height, float(fixed_height.group(1)))
+
+            row_width += cell_width
+            row_height = max(row_height, cell_height)
+        width = max(width, row_width)
+        height += row_height
+    return width, height
+
+
+def estimate_label_size(label):
+    """node label 문자열로 node 크기(width, height) 추정 (point)"""
+    if label.startswith("<") and label.endswith(">"):
+        width, height = estimate_html_label_size(label[1:-1])
+    else:
+        text = _unquote(label)
+        lines = re.split(r"\\n|\\l|\\r|\n", text)
+        width = max((_text_width(line) for line in lines), default=0.0)
+        height = LINE_HEIGHT * max(len(lines), 1)
+    return width + NODE_PADDING_X, height + NODE_PADDING_Y
+
+
+def get_statement_node_id(statement):
+    """DOT body 문장이 node 선언이면 node ID 반환 (edge, 속성 선언이면 None)"""
+    found = NODE_STATEMENT_PATTERN.match(statement)
+    if not found:
+        return None
+    node_id = _unquote(found.group(1))
+    if node_id in NON_NODE_KEYWORDS:
+        return None
+    return node_id
+
+
+def get_node_labels(dot):
+    """DOT body 의 node 선언에서 node ID → label 목록 추출 (label 이 없으면 ID)"""
+    labels = {}
+    for statement in dot.body:
+        node_id = get_statement_node_id(statement)
+        if node_id is None:
+            continue
+        label = LABEL_ATTR_PATTERN.search(statement)
+        if label:
+            labels[node_id] = label.group(1)
+        else:
+            labels.setdefault(node_id, f'"{node_id}"')
+    return labels
+
+
+def snake_grid(count, cols):
+    """snake 형태 격자 (홀수 줄 순차, 짝수 줄 역순) 의 index → (row, col)"""
+    cells = []
+    for idx in range(count):
+        row, col = divmod(idx, cols)
+        if row % 2 == 1:
+            col = cols - col - 1
+        cells.append((row, col))
+    return cells
+
+
+def apply_grid_positions(dot, nodes, cols):
+    """
+    snake 격자의 node 좌표를 직접 계산하여 pos 속성으로 지정 (Graphviz 는 neato -n 으로 edge 만 계산)
+    그래프에 nodes 외의 node 가 있거나 중복 node 가 있으면 False 반환
+    """
+    labels = get_node_labels(dot)
+    if not nodes or len(set(nodes)) != len(nodes) or set(labels) != set(nodes):
+        return False
+
+    cells = snake_grid(len(nodes), cols)
+    sizes = [estimate_label_size(labels[node_id]) for node_id in nodes]
+
+    rows = cells[-1][0] + 1
+    col_widths = [0.0] * cols
+    row_heights = [0.0] * rows
+    for (row, col), (width, height) in zip(cells, sizes):
+        col_widths[col] = max(col_widths[col], width)
+        row_heights[row] = max(row_heights[row], height)
+
+    col_centers, x = [], 0.0
+    for width in col_widths:
+        col_centers.append(x + width / 2)
+        x += width + GRID_COL_GAP
+
+    row_centers, y = [], 0.0
+    for height in row_heights:
+        row_centers.append(y - height / 2)
+        y -= height + GRID_ROW_GAP
+
+    for node_id, (row, col) in zip(nodes, cells):
+        dot.node(node_id, pos=f"{col_centers[col]:.1f},{row_centers[row]:.1f}!")
+
+    dot.engine = "neato"
+    dot.neato_no_op = 1
+    return True
@@ -0,0 +1,166 @@
+import json
+import bisect
+from collections import defaultdict
+
+from timestamps import get_epoch_ms
+
+
+def _has_vars_config(params):
+    return isinstance(params, dict) and params.get('varsConfig') is not None
+
+
+def parameter_fingerprint(params):
+    """Lambda 'parameter' 로그와 비교할 파라미터 fingerprint"""
+    return json.dumps(params, sort_keys=True).replace("id&v", "idnv")
+
+
+def event_fingerprint(params):
+    """Lambda 'Event' 로그와 비교할 파라미터 fingerprint (varsConfig 는 양쪽 모두 있을 때만 제외)"""
+    has_vars = _has_vars_config(params)
+    if has_vars:
+        params = {k: v for k, v in params.items() if k != 'varsConfig'}
+    return has_vars, json.dumps(params, sort_keys=True)
+
+
+def _invocation_key(l):
+    """Lambda 호출 로그의 (인덱스 key, timestamp) 반환 (호출 로그가 아니면 None)"""
+    message = l.get("message", "")
+    if "parameter" in message:
+        key = ("parameter", l.get("ContactId"), parameter_fingerprint(l.get("parameters")))
+    elif "Event" in message and l.get("event"):
+        key = ("event", l.get("ContactId"), event_fingerprint(l["event"]["Details"]["Parameters"]))
+    else:
+        return None
+    return key, get_epoch_ms(l, "timestamp")
+
+
+class InvocationIndex:
+    """Lambda 호출 파라미터 fingerprint → timestamp 정렬 목록 인덱스"""
+
+    def __init__(self, function_logs):
+        entries = defaultdict(list)
+        for l in function_logs:
+            # 필드나 timestamp 가 없는 로그는 어느 block 과도 연결하지 않음
+            try:
+                found = _invocation_key(l)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                print(f"Skipping malformed Lambda log : {e}")
+                continue
+            if found is not None:
+                key, ts = found
+                entries[key].append((ts, l))
+
+        self._timestamps = {}
+        self._logs = {}
+        for key, items in entries.items():
+            items.sort(key=lambda x: x[0])
+            self._timestamps[key] = [t for t, _ in items]
+            self._logs[key] = [l for _, l in items]
+
+    def _nearest(self, key, ts):
+        timestamps = self._timestamps.get(key)
+        if not timestamps:
+            return None
+        pos = bisect.bisect_left(timestamps, ts)
+        candidates = [i for i in (pos - 1, pos) if 0 <= i < len(timestamps)]
+        best = min(candidates, key=lambda i: abs(timestamps[i] - ts))
+        return abs(timestamps[best] - ts), self._logs[key][best]
+
+    def find(self, contact_id, log_parameters, ts):
+        """Flow block 파라미터와 일치하는 Lambda 로그 중 timestamp(epoch ms) 가 가장 가까운 로그 반환"""
+        matches = [
+            self._nearest(("parameter", contact_id, parameter_fingerprint(log_parameters)), ts),
+            self._nearest(("event", contact_id, event_fingerprint(log_parameters)), ts),
+        ]
+        matches = [m for m in matches if m is not None]
+        if not matches:
+            return None
+        return min(matches, key=lambda m: m[0])[1]
+
+
+class NearestTimestampIndex:
+    """timestamp(epoch ms) 순으로 한 번 정렬한 (timestamp, 값) 목록에서 가장 가까운 항목 검색 (같은 거리면 뒤 항목)"""
+
+    def __init__(self, entries):
+        entries = sorted(entries, key=lambda x: x[0])
+        self._timestamps = [t for t, _ in entries]
+        self._values = [v for _, v in entries]
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def _closest(self, pos, ts, default):
+        timestamps = self._timestamps
+        if pos < len(timestamps) and (pos == 0 or timestamps[pos] - ts <= ts - timestamps[pos - 1]):
+            return self._values[pos]
+        if pos > 0:
+            return self._values[pos - 1]
+        return default
+
+    def find(self, ts, default=None):
+        return self._closest(bisect.bisect_left(self._timestamps, ts), ts, default)
+
+    def find_all(self, timestamps, default=None):
+        """timestamp 목록 각각의 가장 가까운 값. 정렬된 목록이면 두 포인터로 한 번에 병합, 아니면 항목별 bisect"""
+        if any(b < a for a, b in zip(timestamps, timestamps[1:])):
+            return [self.find(ts, default) for ts in timestamps]
+
+        result = []
+        pos = 0
+        count = len(self._timestamps)
+        for ts in timestamps:
+            while pos < count and self._timestamps[pos] < ts:
+                pos += 1
+            result.append(self._closest(pos, ts, default))
+        return result
+
+
+class TraceIndex:
+    """xray_trace_id → Lambda 로그 목록, (xray_trace_id, inputTranscript) 존재 여부 인덱스"""
+
+    def __init__(self, function_logs):
+        self._logs = defaultdict(list)
+        self._transcripts = set()
+        for l in function_logs:
+            xray_trace_id = l.get("xray_trace_id")
+            self._logs[xray_trace_id].append(l)
+            self._transcripts.add((xray_trace_id, (l.get("event") or {}).get("inputTranscript")))
+
+    def trace_ids(self):
+        """로그에 나타난 순서대로 xray_trace_id 목록"""
+        return list(self._logs)
+
+    def logs(self, xray_trace_id):
+        return self._logs.get(xray_trace_id, [])
+
+    def has_transcript(self, xray_trace_id, transcript):
+        return (xray_trace_id, transcript) in self._transcripts
+
+
+class LambdaLogs(dict):
+    """function name → Lambda 로그 목록. 함수별 조인 인덱스를 한 번만 생성해 재사용"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._invocation_indexes = {}
+        self._trace_indexes = {}
+
+    def invocation_index(self, function_name):
+        if function_name not in self._invocation_indexes:
+            function_logs = self.get(function_name, [])
+            if not isinstance(function_logs, list):
+                raise TypeError(f"Expected list for function_logs, got {type(function_logs).__name__}")
+            self._invocation_indexes[function_name] = InvocationIndex(function_logs)
+        return self._invocation_indexes[function_name]
+
+    def trace_index(self, function_name):
+        if function_name not in self._trace_indexes:
+            self._trace_indexes[function_name] = TraceIndex(self.get(function_name, []))
+        return self._trace_indexes[function_name]
+
+
+def as_lambda_logs(lambda_logs):
+    """함수별 인덱스를 Lambda 로그 묶음마다 한 번만 만들도록 LambdaLogs 로 변환 (이미 LambdaLogs 면 그대로)"""
+    if lambda_logs is None or isinstance(lambda_logs, LambdaLogs):
+        return lambda_logs
+    return LambdaLogs(lambda_logs)
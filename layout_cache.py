@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import hashlib
+
+from xdot.dot.lexer import DotLexer
+from xdot.dot.parser import DotParser
+from grid_layout import estimate_label_size
+
+LAYOUT_CACHE_DIRECTORY = "./virtual_env/layout_cache"
+
+# 재사용할 edge 좌표 속성
+EDGE_LAYOUT_ATTRS = ("pos", "lp", "head_lp", "tail_lp", "xlp")
+
+ICON_PATTERN = re.compile(r'src="[^"]*?([^/"]+)\.png"')
+EDGE_STATEMENT_PATTERN = re.compile(r'^\s*(?:"(?:[^"\\]|\\.)*"|[^\s"\[]+)\s*->\s*')
+
+
+class GraphCollector(DotParser):
+    """DOT / xdot 코드에서 그래프 속성, node(선언 순서), edge 목록 수집"""
+
+    def __init__(self, dotcode):
+        super().__init__(DotLexer(buf=dotcode))
+        self.graph_attrs = {}
+        self.nodes = {}
+        self.edges = []
+        self.has_subgraph = False
+
+    def parse_subgraph(self):
+        self.has_subgraph = True
+        return super().parse_subgraph()
+
+    def handle_graph(self, attrs):
+        self.graph_attrs.update(attrs)
+
+    def handle_node(self, id, attrs):
+        self.nodes.setdefault(id, {}).update(attrs)
+
+    def handle_edge(self, src_id, dst_id, attrs):
+        # edge 로만 선언된 node 도 좌표 대상에 포함
+        self.nodes.setdefault(src_id, {})
+        self.nodes.setdefault(dst_id, {})
+        self.edges.append((src_id, dst_id, attrs))
+
+
+def collect_graph(dotcode):
+    collector = GraphCollector(dotcode)
+    collector.parse()
+    return collector
+
+
+def _label_box(label):
+    """label 의 추정 크기 (point, 크기가 조금이라도 다르면 다른 구조로 취급)"""
+    text = label.decode("utf-8", "replace")
+    if text.lstrip().startswith("<"):
+        width, height = estimate_label_size(f"<{text}>")
+    else:
+        width, height = estimate_label_size(f'"{text}"')
+    return round(width, 1), round(height, 1)
+
+
+def _node_shape(attrs):
+    label = attrs.get("label", b"")
+    return (
+        attrs.get("shape", b"").decode("utf-8"),
+        tuple(ICON_PATTERN.findall(label.decode("utf-8", "replace"))),
+        _label_box(label),
+    )
+
+
+def structural_key(graph, engine, neato_no_op):
+    """node 순서, 모듈 타입(icon), label 크기, edge 구성으로 그래프 구조 hash 계산 (node ID, label 내용은 제외)"""
+    index = {node_id: i for i, node_id in enumerate(graph.nodes)}
+    graph_attrs = sorted(
+        (name, _label_box(value) if name == "label" else value.decode("utf-8", "replace"))
+        for name, value in graph.graph_attrs.items()
+    )
+    structure = {
+        "engine": engine,
+        "neato_no_op": neato_no_op or 0,
+        "graph": graph_attrs,
+        "nodes": [_node_shape(attrs) for attrs in graph.nodes.values()],
+        "edges": [
+            (index[src], index[dst], sorted(name for name in attrs if name.endswith("label")))
+            for src, dst, attrs in graph.edges
+        ],
+    }
+    text = json.dumps(structure, ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def extract_layout(graph, xdotcode):
+    """render 결과(xdot)에서 입력 node / edge 순서대로 좌표 추출 (대응되지 않으면 None)"""
+    rendered = collect_graph(xdotcode)
+
+    node_positions = []
+    for node_id in graph.nodes:
+        pos = rendered.nodes.get(node_id, {}).get("pos")
+        if pos is None:
+            return None
+        node_positions.append(pos.decode("utf-8"))
+
+    # 같은 (tail, head) edge 가 여러 개면 선언 순서대로 대응
+    rendered_edges = {}
+    for src, dst, attrs in rendered.edges:
+        rendered_edges.setdefault((src, dst), []).append(attrs)
+
+    edge_layouts = []
+    for src, dst, _ in graph.edges:
+        candidates = rendered_edges.get((src, dst))
+        if not candidates:
+            return None
+        attrs = candidates.pop(0)
+        edge_layouts.append({
+            name: attrs[name].decode("utf-8") for name in EDGE_LAYOUT_ATTRS if name in attrs
+        })
+
+    return {"nodes": node_positions, "edges": edge_layouts}
+
+
+def apply_layout(dot, graph, layout):
+    """저장된 좌표를 node / edge 에 지정한 그래프 반환 (neato -n2 로 render, 구조가 다르면 None)"""
+    if len(layout["nodes"]) != len(graph.nodes) or len(layout["edges"]) != len(graph.edges):
+        return None
+    edge_statements = [statement for statement in dot.body if EDGE_STATEMENT_PATTERN.match(statement)]
+    if len(edge_statements) != len(graph.edges):
+        return None
+
+    positioned = dot.copy()
+    positioned.body = []
+    edge_layouts = iter(layout["edges"])
+    for statement in dot.body:
+        if EDGE_STATEMENT_PATTERN.match(statement):
+            statement = _with_edge_layout(statement, next(edge_layouts))
+        positioned.body.append(statement)
+    for node_id, pos in zip(graph.nodes, layout["nodes"]):
+        positioned.node(node_id.decode("utf-8"), pos=pos)
+
+    positioned.engine = "neato"
+    positioned.neato_no_op = 2
+    return positioned
+
+
+def save_layout(path, layout):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(layout, f)
+    os.replace(temp_path, path)
+
+
+def load_layout(path):
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading layout {path}: {e}")
+        return None
+
+
+class LayoutCache:
+    """구조 hash → node / edge 좌표 저장소 (hit 이면 좌표를 지정하고 neato -n2 로 label 만 다시 그림)"""
+
+    def __init__(self, directory=LAYOUT_CACHE_DIRECTORY):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        return load_layout(self._path(key))
+
+    def store(self, key, graph, xdotcode):
+        """render 결과(xdot)에서 좌표를 추출하여 저장"""
+        layout = extract_layout(graph, xdotcode)
+        if layout is not None:
+            save_layout(self._path(key), layout)
+
+    def prepare(self, dot, neato_no_op=None):
+        """
+        render 할 (source, engine, neato_no_op, on_rendered) 반환
+        cache hit 이면 좌표를 채운 source 와 neato -n2, miss 이면 원본 source 와 render 후 좌표 저장 callback
+        좌표가 입력으로 고정된 그래프 (neato -n, node pos) 는 cache 대상이 아님
+        """
+        source = dot.source
+        if neato_no_op:
+            return source, dot.engine, neato_no_op, None
+        try:
+            graph = collect_graph(source.encode("utf-8"))
+        except Exception as e:
+            print(f"Error parsing graph for layout cache: {e}")
+            return source, dot.engine, neato_no_op, None
+        if graph.has_subgraph or not graph.nodes or any("pos" in attrs for attrs in graph.nodes.values()):
+            return source, dot.engine, neato_no_op, None
+
+        key = structural_key(graph, dot.engine, neato_no_op)
+        layout = self.load(key)
+        if layout is None:
+            return source, dot.engine, neato_no_op, lambda xdotcode: self.store(key, graph, xdotcode)
+
+        positioned = apply_layout(dot, graph, layout)
+        if positioned is None:
+            return source, dot.engine, neato_no_op, None
+        return positioned.source, positioned.engine, positioned.neato_no_op, None
+
+
+def _with_edge_layout(statement, edge_layout):
+    """edge 선언 문장에 좌표 속성 추가"""
+    attrs = " ".join(f'{name}="{value}"' for name, value in edge_layout.items())
+    if not attrs:
+        return statement
+    body = statement.rstrip("\n")
+    if body.endswith("]"):
+        return f"{body[:-1]} {attrs}]\n"
+    return f"{body} [{attrs}]\n"
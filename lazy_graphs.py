@@ -0,0 +1,70 @@
+import threading
+import traceback
+
+from graph_render import wait_for_renders
+from node_store import flush_payload_stores
+
+
+class _LazyGraph:
+    def __init__(self, build):
+        self.build = build
+        self.lock = threading.Lock()
+        self.done = False
+
+
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def register_lazy_graph(output_path, build):
+    """처음 열릴 때 생성할 drill-down 그래프 등록 (build 는 그래프를 만들고 render 까지 수행)"""
+    with _pending_lock:
+        _pending[output_path] = _LazyGraph(build)
+
+
+def ensure_graph(output_path):
+    """
+    등록된 그래프라면 생성 및 render 완료까지 수행 (이미 생성된 경우 바로 반환)
+    생성에 실패하면 오류 메시지 반환 (등록은 유지하여 다시 열 때 재시도)
+    """
+    with _pending_lock:
+        entry = _pending.get(output_path)
+    if entry is None:
+        return None
+
+    with entry.lock:
+        if not entry.done:
+            print(f"서브 그래프 생성: {output_path}")
+            try:
+                entry.build()
+            except Exception as e:
+                print(f"Error building {output_path}: {e}")
+                print(traceback.format_exc())
+                return f"서브 그래프 생성 실패 : {output_path}\n{e}"
+            failed = wait_for_renders()
+            flush_payload_stores()
+            if output_path in failed:
+                return f"서브 그래프 render 실패 : {output_path}"
+            entry.done = True
+
+    with _pending_lock:
+        _pending.pop(output_path, None)
+    return None
+
+
+def _precompute_pending():
+    while True:
+        with _pending_lock:
+            if not _pending:
+                return
+            output_path = next(iter(_pending))
+        if ensure_graph(output_path):
+            with _pending_lock:
+                _pending.pop(output_path, None)
+
+
+def start_background_precompute():
+    """남은 drill-down 그래프를 background thread 에서 미리 생성"""
+    thread = threading.Thread(target=_precompute_pending, name="lazy-graph-precompute", daemon=True)
+    thread.start()
+    return thread
@@ -1,37 +1,45 @@
-import os
-import json
 import uuid
+from itertools import groupby
 
 from graphviz import Digraph
-from utils import wrap_transcript, apply_rank, find_lex_xray_timestamp
-from graph_labels import get_image_label, get_node_label, add_edges
+from utils import wrap_transcript, apply_rank
+from timestamps import get_epoch_ms
+from graph_labels import get_node_label, add_edges
 from xray_builder import build_xray_dot
+from artifacts import ContactArtifacts
+from artifact_bus import get_artifact, has_artifact
 from fetch_data_from_s3 import get_analysis_object
+from node_store import put_payload
+from graph_render import render_graph
 
 
-def build_lex_dot(contact_id, region):
-    """Lex 대화 내용을 시각화합니다."""
-    file_path = f"./virtual_env/lex_{contact_id}.json"
-    if not os.path.isfile(file_path):
-        return []
-
-    with open(file_path, "r", encoding="utf-8") as f:
-        lex_transcript = json.loads(f.read())
+def has_lex_logs(file_path):
+    """Lex 로그가 존재하고 비어 있지 않은지 확인 (지연 생성 모드에서 노드 표시 여부 판단)"""
+    return bool(get_artifact(file_path))
 
-    function_logs = []
-    lex_hook_path = f"./virtual_env/lex_hook_{contact_id}.json"
-    if os.path.isfile(lex_hook_path):
-        with open(lex_hook_path, "r", encoding="utf-8") as f:
-            function_logs = json.loads(f.read())
 
+def build_lex_dot(contact_id, region, artifacts=None):
+    """Lex 대화 내용을 시각화합니다."""
+    lex_transcript = get_artifact(f"./virtual_env/lex_{contact_id}.json")
     if not lex_transcript:
         return []
 
+    artifacts = artifacts or ContactArtifacts(contact_id, region)
+    function_logs = artifacts.lex_hook_logs()
+    trace_index = artifacts.lex_hook_trace_index()
+
     lex_dot = Digraph(comment="Transcript")
     lex_dot.attr(rankdir="LR")
     lex_nodes = []
 
-    for script in lex_transcript:
+    # 대화별 가장 가까운 Hook 로그의 xray_trace_id (대화가 시간 순이면 한 번의 병합으로 계산)
+    script_trace_ids = []
+    if function_logs:
+        script_trace_ids = artifacts.lex_hook_timestamp_index().find_all(
+            [get_epoch_ms(script, "timestamp") for script in lex_transcript], ""
+        )
+
+    for script_index, script in enumerate(lex_transcript):
         customer_node_id = script.get("requestId", str(uuid.uuid4())) + "-customer"
         lex_nodes.append(customer_node_id)
 
@@ -55,19 +63,15 @@ def build_lex_dot(contact_id, region):
             shape='box',
             style='rounded,filled',
             color='lightgray',
-            URL=str(json.dumps(script, indent=4, ensure_ascii=False))
+            URL=put_payload(contact_id, script)
         )
 
         if function_logs:
-            xray_trace_id = find_lex_xray_timestamp(script, function_logs)
-            is_transcript_found = any(
-                l.get("xray_trace_id") == xray_trace_id
-                and l.get("event", {}).get("inputTranscript") == script.get("inputTranscript")
-                for l in function_logs
-            )
+            xray_trace_id = script_trace_ids[script_index]
+            is_transcript_found = trace_index.has_transcript(xray_trace_id, script.get("inputTranscript"))
             if xray_trace_id and is_transcript_found:
                 lex_dot, lex_nodes, _ = build_xray_dot(
-                    lex_dot, lex_nodes, 0, xray_trace_id, region, function_logs, {}, None, contact_id
+                    lex_dot, lex_nodes, 0, xray_trace_id, region, trace_index, {}, None, contact_id, artifacts
                 )
 
         agent_node_id = script.get("requestId", "") + "-agent"
@@ -89,20 +93,19 @@ def build_lex_dot(contact_id, region):
             shape='box',
             style='rounded,filled',
             color='lightgray',
-            URL=str(json.dumps(script, indent=4, ensure_ascii=False))
+            URL=put_payload(contact_id, script)
         )
 
     lex_dot = add_edges(lex_dot, lex_nodes)
     apply_rank(lex_dot, lex_nodes)
-    lex_dot.render(f"./virtual_env/lex_{contact_id}", format="dot", cleanup=True)
+    render_graph(lex_dot, f"./virtual_env/lex_{contact_id}")
 
     return lex_nodes
 
 
-def build_lex_hook_dot(contact_id, region):
+def build_lex_hook_dot(contact_id, region, artifacts=None):
     """Lex Hook Lambda 실행 내용을 시각화합니다."""
-    lex_hook_path = f"./virtual_env/lex_hook_{contact_id}.json"
-    if not os.path.isfile(lex_hook_path):
+    if not has_artifact(f"./virtual_env/lex_hook_{contact_id}.json"):
         return [], 0
 
     nodes = []
@@ -111,19 +114,17 @@ def build_lex_hook_dot(contact_id, region):
     lex_hook_dot = Digraph(comment="Lex Hook")
     lex_hook_dot.attr(rankdir="LR")
 
-    with open(lex_hook_path, "r", encoding="utf-8") as f:
-        function_logs = json.loads(f.read())
+    artifacts = artifacts or ContactArtifacts(contact_id, region)
+    trace_index = artifacts.lex_hook_trace_index()
 
-    xray_trace_ids = {log.get("xray_trace_id") for log in function_logs}
-
-    for xray_trace_id in xray_trace_ids:
+    for xray_trace_id in trace_index.trace_ids():
         lex_hook_dot, nodes, error_count = build_xray_dot(
-            lex_hook_dot, nodes, error_count, xray_trace_id, region, function_logs, {}, None, contact_id
+            lex_hook_dot, nodes, error_count, xray_trace_id, region, trace_index, {}, None, contact_id, artifacts
         )
 
     lex_hook_dot = add_edges(lex_hook_dot, nodes)
     apply_rank(lex_hook_dot, nodes)
-    lex_hook_dot.render(f"./virtual_env/lex_hook_{contact_id}", format="dot", cleanup=True)
+    render_graph(lex_hook_dot, f"./virtual_env/lex_hook_{contact_id}")
 
     return nodes, error_count
 
@@ -138,55 +139,37 @@ def build_transcript_dot(env, contact_id, region, instance_id):
     transcript_dot.attr(rankdir="LR")
 
     transcript_nodes = []
-    temp_dup_set = set()
 
-    for index, script in enumerate(contact_transcript):
-        is_last = index + 1 == len(contact_transcript)
-        next_same_participant = (
-            not is_last
-            and script.get("ParticipantId") == contact_transcript[index + 1].get("ParticipantId")
+    # 같은 참여자의 연속 발화는 한 노드로 병합 (한 번 순회하며 그룹별로 바로 노드 생성)
+    for participant_id, group in groupby(contact_transcript, key=lambda x: x.get("ParticipantId")):
+        scripts = list(group)
+        if len(scripts) > 1:
+            scripts.sort(key=lambda x: x['BeginOffsetMillis'])
+            script_contents = "/".join(n.get("Content") for n in scripts)
+            detail = put_payload(contact_id, scripts)
+        else:
+            script_contents = scripts[0].get("Content")
+            detail = put_payload(contact_id, scripts[0])
+
+        node_id = scripts[0].get("Id")
+        label = get_node_label(
+            participant_id.lower(),
+            participant_id.lower(),
+            wrap_transcript(script_contents), None, None
         )
 
-        if next_same_participant:
-            temp_dup_set.add(script.get("Id"))
-            temp_dup_set.add(contact_transcript[index + 1].get("Id"))
-        else:
-            if temp_dup_set:
-                temp_nodes = sorted(
-                    [l for l in contact_transcript if l.get("Id") in temp_dup_set],
-                    key=lambda x: x['BeginOffsetMillis']
-                )
-                script_contents = "/".join(n.get("Content") for n in temp_nodes)
-                temp_dup_set = set()
-
-                node_id = temp_nodes[0].get("Id")
-                label = get_node_label(
-                    temp_nodes[0].get("ParticipantId").lower(),
-                    temp_nodes[0].get("ParticipantId").lower(),
-                    wrap_transcript(script_contents), None, None
-                )
-                detail = str(json.dumps(temp_nodes, indent=4, ensure_ascii=False))
-            else:
-                node_id = script.get("Id")
-                label = get_node_label(
-                    script.get("ParticipantId").lower(),
-                    script.get("ParticipantId").lower(),
-                    wrap_transcript(script.get("Content")), None, None
-                )
-                detail = str(json.dumps(script, indent=4, ensure_ascii=False))
-
-            transcript_nodes.append(node_id)
-            transcript_dot.node(
-                node_id,
-                label=label,
-                shape='box',
-                style='rounded,filled',
-                color='lightgray',
-                URL=detail
-            )
+        transcript_nodes.append(node_id)
+        transcript_dot.node(
+            node_id,
+            label=label,
+            shape='box',
+            style='rounded,filled',
+            color='lightgray',
+            URL=detail
+        )
 
     transcript_dot = add_edges(transcript_dot, transcript_nodes)
     apply_rank(transcript_dot, transcript_nodes)
-    transcript_dot.render(f"./virtual_env/transcript_{contact_id}", format="dot", cleanup=True)
+    render_graph(transcript_dot, f"./virtual_env/transcript_{contact_id}")
 
     return transcript_nodes
@@ -0,0 +1,178 @@
+import sys
+import json
+from collections.abc import Mapping, MutableMapping
+
+
+# slot 으로 보관하는 자주 접근하는 필드
+HOT_FIELDS = (
+    "ContactId", "ContactFlowId", "ContactFlowName", "ContactFlowModuleType",
+    "Identifier", "Timestamp", "Results", "node_id",
+)
+_HOT_FIELD_SET = frozenset(HOT_FIELDS)
+
+# 반복되는 값이 많아 intern 하는 필드
+INTERNED_FIELDS = frozenset((
+    "ContactId", "ContactFlowId", "ContactFlowName", "ContactFlowModuleType", "Identifier",
+))
+
+# 동일한 key 구성을 가진 레코드끼리 key tuple 공유
+_key_shapes = {}
+
+
+def _shared_keys(keys):
+    keys = tuple(keys)
+    return _key_shapes.setdefault(keys, keys)
+
+
+def _intern(key, value):
+    if key in INTERNED_FIELDS and isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class LogRecord(MutableMapping):
+    """
+    Connect Flow 로그 레코드. 주요 필드는 slot 에, 나머지는 원본 JSON bytes 로 보관
+    나머지 필드에 처음 접근할 때 한 번만 decode 하여 _cold 에 보관 (이후 접근 / 수정은 _cold 사용, to_dict 는 보관하지 않음)
+    """
+
+    __slots__ = HOT_FIELDS + ("_raw", "_cold", "_keys", "_derived")
+
+    def __init__(self, data, raw=None):
+        for key in _HOT_FIELD_SET.intersection(data):
+            object.__setattr__(self, key, _intern(key, data[key]))
+        if raw is None:
+            raw = json.dumps(
+                {k: v for k, v in data.items() if k not in _HOT_FIELD_SET}, ensure_ascii=False
+            ).encode("utf-8")
+        self._raw = raw
+        self._cold = None
+        self._keys = _shared_keys(data)
+
+    @classmethod
+    def from_message(cls, message, data=None):
+        """CloudWatch @message 문자열로 레코드 생성 (원본 문자열을 그대로 payload 로 사용)"""
+        if data is None:
+            data = json.loads(message)
+        return cls(data, message.encode("utf-8"))
+
+    def _cold_fields(self, keep=True):
+        """
+        slot 이 아닌 필드 dict (원본 bytes 는 처음 접근할 때 한 번만 decode 하여 보관)
+        keep 이 False 면 decode 결과를 보관하지 않고 원본 bytes 유지 (직렬화처럼 한 번 읽고 버리는 경우)
+        """
+        if self._raw is None:
+            return self._cold
+        cold = json.loads(self._raw)
+        if self._cold:
+            cold.update(self._cold)
+        if keep:
+            self._cold = cold
+            self._raw = None
+        return cold
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in _HOT_FIELD_SET:
+            return getattr(self, key)
+        return self._cold_fields()[key]
+
+    def __setitem__(self, key, value):
+        if key in _HOT_FIELD_SET:
+            object.__setattr__(self, key, _intern(key, value))
+        else:
+            # decode 전에 추가된 필드는 decode 시 원본 위에 덮어씀
+            if self._cold is None:
+                self._cold = {}
+            self._cold[key] = value
+        if key not in self._keys:
+            self._keys = _shared_keys(self._keys + (key,))
+
+    def __delitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        self._keys = _shared_keys(k for k in self._keys if k != key)
+        if key in _HOT_FIELD_SET:
+            object.__delattr__(self, key)
+        elif self._cold:
+            self._cold.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def to_dict(self):
+        """일반 dict 로 변환 (decode 한 나머지 필드는 보관하지 않아 저장 후에도 레코드는 compact 상태 유지)"""
+        cold = None
+        result = {}
+        for key in self._keys:
+            if key in _HOT_FIELD_SET:
+                result[key] = getattr(self, key)
+            else:
+                if cold is None:
+                    cold = self._cold_fields(keep=False)
+                result[key] = cold[key]
+        return result
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"LogRecord({self.to_dict()!r})"
+
+
+class LogEntry(dict):
+    """Lambda / Lex 로그처럼 dict 로 보관하는 로그 레코드 (파생 값은 JSON 에 포함되지 않는 slot 에 보관)"""
+
+    __slots__ = ("_derived",)
+
+
+def _derived_values(record):
+    """레코드의 파생 값 dict (LogRecord / LogEntry 가 아니면 None)"""
+    try:
+        return record._derived
+    except AttributeError:
+        if not isinstance(record, (LogRecord, LogEntry)):
+            return None
+        record._derived = {}
+        return record._derived
+
+
+def has_derived(record, name):
+    derived = _derived_values(record)
+    return derived is not None and name in derived
+
+
+def set_derived(record, name, value):
+    """레코드에서 계산한 값 보관 (로그 필드와 분리되어 저장 / 표시되는 JSON 에 포함되지 않음)"""
+    derived = _derived_values(record)
+    if derived is not None:
+        derived[name] = value
+    return value
+
+
+def get_derived(record, name, compute):
+    """보관된 파생 값 반환 (없으면 compute() 결과를 보관, 일반 dict 는 매번 계산)"""
+    derived = _derived_values(record)
+    if derived is None:
+        return compute()
+    if name not in derived:
+        derived[name] = compute()
+    return derived[name]
+
+
+def json_default(obj):
+    """json.dumps(default=...) 용 LogRecord 직렬화"""
+    if isinstance(obj, LogRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
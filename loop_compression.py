@@ -0,0 +1,61 @@
+from constants import LOOP_MIN_REPEAT, LOOP_MAX_PERIOD
+
+
+class LoopSegment:
+    """같은 구간이 repeat 번 연속 반복된 구간 (items 는 원본 순서 그대로)"""
+
+    __slots__ = ("period", "repeat", "items")
+
+    def __init__(self, period, repeat, items):
+        self.period = period
+        self.repeat = repeat
+        self.items = items
+
+    @property
+    def iterations(self):
+        return [self.items[i * self.period:(i + 1) * self.period] for i in range(self.repeat)]
+
+    def __repr__(self):
+        return f"LoopSegment(period={self.period}, repeat={self.repeat})"
+
+
+def find_loops(keys, min_repeat=LOOP_MIN_REPEAT, max_period=LOOP_MAX_PERIOD):
+    """
+    key 목록에서 연속 반복 구간을 앞에서부터 찾아 (start, period, repeat) 목록 반환
+    가장 많은 항목을 덮는 주기를 선택하고, 같으면 짧은 주기 우선. key 가 None 이면 반복에 포함하지 않음
+    """
+    loops = []
+    count = len(keys)
+    start = 0
+    while start < count:
+        best = None
+        for period in range(1, min(max_period, (count - start) // min_repeat) + 1):
+            pattern = keys[start:start + period]
+            if None in pattern:
+                break
+            repeat = 1
+            while keys[start + repeat * period:start + (repeat + 1) * period] == pattern:
+                repeat += 1
+            if repeat >= min_repeat and (best is None or period * repeat > best[0] * best[1]):
+                best = (period, repeat)
+
+        if best:
+            loops.append((start, best[0], best[1]))
+            start += best[0] * best[1]
+        else:
+            start += 1
+    return loops
+
+
+def compress_sequence(items, key):
+    """반복 구간을 LoopSegment 로 묶은 목록 반환 (반복되지 않는 항목은 그대로)"""
+    keys = [key(item) for item in items]
+    segments = []
+    position = 0
+    for start, period, repeat in find_loops(keys):
+        segments.extend(items[position:start])
+        end = start + period * repeat
+        segments.append(LoopSegment(period, repeat, items[start:end]))
+        position = end
+    segments.extend(items[position:])
+    return segments
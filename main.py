@@ -9,6 +9,10 @@ import re
 from collections import defaultdict
 from xdot.ui.window import MainDotWindow
 from dot_builder import build_main_contacts
+from graph_render import render_graph, wait_for_renders
+from artifact_bus import flush_artifacts
+from lazy_graphs import start_background_precompute
+from constants import LAZY_SUBGRAPH_FLAG, LAZY_PRECOMPUTE_FLAG
 # gtk
 import gi
 gi.require_version('Gtk', '3.0')
@@ -35,7 +39,11 @@ def save_graph(dot, associated_contacts, output_file=f"{FILE_PREFIX}{SELECTED_CO
     """
     fmt = "dot"
     file_path = f"./virtual_env/{output_file}"
-    dot.render(file_path, format=fmt, cleanup=True)
+    render_graph(dot, file_path)
+    wait_for_renders()
+    flush_artifacts()
+    if LAZY_SUBGRAPH_FLAG and LAZY_PRECOMPUTE_FLAG:
+        start_background_precompute()
     print(f"Contact 시각화가 {file_path}.{fmt} (으)로 저장되었습니다.")
 
     window = MainDotWindow(f"{file_path}.{fmt}", associated_contacts)
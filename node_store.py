@@ -0,0 +1,153 @@
+import os
+import json
+import hashlib
+import threading
+
+from log_record import json_default
+
+# DOT URL 속성에 들어가는 노드 상세 정보 참조 prefix
+PAYLOAD_REF_PREFIX = "payload:"
+
+PAYLOAD_DIRECTORY = "./virtual_env"
+
+
+def _payload_path(contact_id):
+    return f"{PAYLOAD_DIRECTORY}/node_payload_{contact_id}.jsonl"
+
+
+def _index_path(contact_id):
+    return f"{PAYLOAD_DIRECTORY}/node_payload_{contact_id}.idx.json"
+
+
+def _scan_index(path):
+    """JSON lines 파일을 읽어 key → offset 인덱스 재구성"""
+    index = {}
+    if not os.path.isfile(path):
+        return index
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                index[json.loads(line)["k"]] = offset
+            offset += len(line)
+    return index
+
+
+def _load_index(contact_id):
+    index_path = _index_path(contact_id)
+    if os.path.isfile(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return _scan_index(_payload_path(contact_id))
+
+
+class NodePayloadStore:
+    """Contact 별 노드 상세 정보 저장소 (JSON lines + offset 인덱스, 내용 hash 로 중복 제거)"""
+
+    def __init__(self, contact_id):
+        self.contact_id = contact_id
+        self.path = _payload_path(contact_id)
+        self._lock = threading.Lock()
+        self._index = _load_index(contact_id)
+        self._file = None
+
+    def put(self, payload):
+        """payload 를 저장하고 DOT URL 에 넣을 짧은 참조 문자열 반환"""
+        text = json.dumps(payload, ensure_ascii=False, default=json_default)
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            if key not in self._index:
+                if self._file is None:
+                    self._file = open(self.path, "ab")
+                self._file.seek(0, os.SEEK_END)
+                self._index[key] = self._file.tell()
+                self._file.write(f'{{"k": "{key}", "d": {text}}}\n'.encode("utf-8"))
+        return f"{PAYLOAD_REF_PREFIX}{self.contact_id}:{key}"
+
+    def get(self, key):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            offset = self._index.get(key)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())["d"]
+
+    def flush(self):
+        """payload 파일과 인덱스를 디스크에 기록"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(_index_path(self.contact_id), "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+
+    def reload(self):
+        """인덱스에 없는 key 조회 시 payload 파일을 다시 읽어 인덱스 재구성"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            self._index = _scan_index(self.path)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_payload_store(contact_id):
+    """Contact 별 저장소 반환 (프로세스 내에서 하나만 생성)"""
+    with _stores_lock:
+        if contact_id not in _stores:
+            _stores[contact_id] = NodePayloadStore(contact_id)
+        return _stores[contact_id]
+
+
+def put_payload(contact_id, payload):
+    return get_payload_store(contact_id).put(payload)
+
+
+def flush_payload_stores():
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
+
+
+def is_payload_ref(url):
+    return isinstance(url, str) and url.startswith(PAYLOAD_REF_PREFIX)
+
+
+def load_payload(ref):
+    """참조 문자열로 노드 상세 정보 조회"""
+    contact_id, key = ref[len(PAYLOAD_REF_PREFIX):].rsplit(":", 1)
+    store = get_payload_store(contact_id)
+    payload = store.get(key)
+    if payload is None:
+        store.reload()
+        payload = store.get(key)
+    return payload
+
+
+def load_payload_text(ref):
+    payload = load_payload(ref)
+    if isinstance(payload, str):
+        return payload
+    return json.dumps(payload, indent=4, ensure_ascii=False)
+
+
+def find_payload_refs(keyword):
+    """keyword 를 포함하는 payload 참조 목록 (deep search 용)"""
+    refs = set()
+    if not os.path.isdir(PAYLOAD_DIRECTORY):
+        return refs
+    for filename in os.listdir(PAYLOAD_DIRECTORY):
+        if not (filename.startswith("node_payload_") and filename.endswith(".jsonl")):
+            continue
+        contact_id = filename[len("node_payload_"):-len(".jsonl")]
+        with open(os.path.join(PAYLOAD_DIRECTORY, filename), "r", encoding="utf-8") as f:
+            for line in f:
+                if keyword in line:
+                    refs.add(f"{PAYLOAD_REF_PREFIX}{contact_id}:{json.loads(line)['k']}")
+    return refs
@@ -0,0 +1,139 @@
+import threading
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Task:
+    __slots__ = ("name", "fn", "deps", "pool", "state", "result", "pending")
+
+    def __init__(self, name, fn, deps, pool):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.pool = pool
+        self.state = PENDING
+        self.result = None
+        # 아직 끝나지 않은 입력 작업 수
+        self.pending = 0
+
+
+class TaskGraph:
+    """
+    의존 관계가 있는 작업 DAG. 입력 작업이 모두 끝나는 즉시 작업 종류(pool) 별 thread pool 에서 실행
+    작업 실행 중에도 새 작업을 추가할 수 있고, 아직 추가되지 않은 작업 이름에도 의존할 수 있음
+    """
+
+    def __init__(self, limits):
+        self._executors = {
+            pool: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"task-{pool}")
+            for pool, max_workers in limits.items()
+        }
+        self._tasks = {}
+        # 작업 이름 → 그 작업이 끝나기를 기다리는 작업 (아직 추가되지 않은 이름 포함)
+        self._dependents = defaultdict(list)
+        self._running = 0
+        self._fatal = None
+        self._condition = threading.Condition()
+
+    def add(self, name, fn, deps=(), pool="cpu"):
+        """
+        작업 추가 (같은 이름의 작업이 이미 있으면 무시)
+        fn 은 deps 작업 결과를 순서대로 인자로 받음
+        """
+        with self._condition:
+            if name in self._tasks:
+                return
+            task = Task(name, fn, deps, pool)
+            self._tasks[name] = task
+
+            failed = False
+            for dep in task.deps:
+                dep_task = self._tasks.get(dep)
+                if dep_task is not None and dep_task.state == DONE:
+                    continue
+                if dep_task is not None and dep_task.state == FAILED:
+                    failed = True
+                    continue
+                task.pending += 1
+                self._dependents[dep].append(task)
+
+            if failed:
+                self._fail(task)
+            elif not task.pending:
+                self._submit(task)
+
+    def _submit(self, task):
+        """lock 안에서 호출"""
+        task.state = RUNNING
+        self._running += 1
+        self._executors[task.pool].submit(self._run, task)
+
+    def _fail(self, task):
+        """작업과 그 작업을 기다리는 작업을 모두 실패 처리 (lock 안에서 호출)"""
+        stack = [task]
+        while stack:
+            task = stack.pop()
+            if task.state in (DONE, FAILED):
+                continue
+            task.state = FAILED
+            stack.extend(self._dependents.pop(task.name, ()))
+
+    def _finish(self, task, result, state):
+        """끝난 작업을 기다리던 작업만 다시 확인 (lock 안에서 호출)"""
+        task.result = result
+        if state == FAILED:
+            self._fail(task)
+            return
+        task.state = DONE
+        for dependent in self._dependents.pop(task.name, ()):
+            if dependent.state != PENDING:
+                continue
+            dependent.pending -= 1
+            if not dependent.pending:
+                self._submit(dependent)
+
+    def _run(self, task):
+        args = [self._tasks[dep].result for dep in task.deps]
+        try:
+            result, state = task.fn(*args), DONE
+        except Exception as e:
+            print(f"Error in task {task.name}: {e}")
+            print(traceback.format_exc())
+            result, state = None, FAILED
+        except BaseException as e:
+            # sys.exit 등은 run() 을 호출한 thread 에서 다시 발생
+            result, state = None, FAILED
+            self._fatal = self._fatal or e
+
+        with self._condition:
+            self._running -= 1
+            self._finish(task, result, state)
+            self._condition.notify_all()
+
+    def run(self):
+        """
+        실행 중인 작업이 없을 때까지 대기한 뒤 성공한 작업의 {이름: 결과} 반환
+        끝까지 입력이 추가되지 않은 작업은 실패 처리
+        """
+        with self._condition:
+            while self._running:
+                self._condition.wait()
+            for name, task in self._tasks.items():
+                if task.state != PENDING:
+                    continue
+                missing = [dep for dep in task.deps if dep not in self._tasks]
+                print(f"Error in task {name}: missing dependencies {missing}")
+                task.state = FAILED
+            self._dependents.clear()
+
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+        if self._fatal is not None:
+            raise self._fatal
+        return {name: task.result for name, task in self._tasks.items() if task.state == DONE}
@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+from graphviz import Digraph
+
+import flow_builder
+from log_record import LogRecord, LogEntry
+from lambda_index import LambdaLogs
+
+CONTACT_ID = "contact-1"
+FUNCTION_ARN = "arn:aws:lambda:ap-northeast-2:123456789012:function:aicc-dev-an2-fn-check"
+
+
+def make_block(second, module_type, identifier, results="", parameters=None):
+    log = {
+        "ContactId": CONTACT_ID,
+        "ContactFlowName": "MainFlow",
+        "ContactFlowId": "flow-1",
+        "ContactFlowModuleType": module_type,
+        "Identifier": identifier,
+        "Timestamp": f"2026-01-01T00:00:{second:02d}.000Z",
+        "Results": results,
+    }
+    if parameters is not None:
+        log["Parameters"] = {"FunctionArn": FUNCTION_ARN, "Parameters": parameters}
+    return LogRecord(log)
+
+
+def make_contact_logs():
+    """Error block 과 Lambda 호출이 3 번 반복된 뒤 Error block 하나로 끝나는 Flow 로그"""
+    logs = []
+    for number in range(3):
+        logs.append(make_block(number * 2, "PlayPrompt", "prompt", results="Error"))
+        logs.append(make_block(number * 2 + 1, "InvokeExternalResource", "lambda", parameters={"turn": str(number)}))
+    logs.append(make_block(10, "PlayPrompt", "goodbye", results="Error"))
+    return logs
+
+
+def make_lambda_logs():
+    return LambdaLogs({"fn-check": [
+        LogEntry({
+            "ContactId": CONTACT_ID,
+            "message": "parameter",
+            "parameters": {"turn": str(number)},
+            "timestamp": f"2026-01-01T00:00:{number * 2 + 1:02d}.100Z",
+            "xray_trace_id": f"trace-{number}",
+        })
+        for number in range(3)
+    ]})
+
+
+def fake_build_xray_dot(dot, nodes, error_count, *args, **kwargs):
+    """X-Ray 조회 없이 Lambda 호출 하나당 Error 1 개로 계산"""
+    return dot, nodes, error_count + 1
+
+
+class ProcessSubFlowErrorCountTest(unittest.TestCase):
+
+    def count_errors(self, loop_compression):
+        with mock.patch.object(flow_builder, "LOOP_COMPRESSION_FLAG", loop_compression), \
+                mock.patch.object(flow_builder, "LAZY_SUBGRAPH_FLAG", False), \
+                mock.patch.object(flow_builder, "FLOW_DEFINITION_VIEW_FLAG", False), \
+                mock.patch.object(flow_builder, "build_xray_dot", fake_build_xray_dot), \
+                mock.patch.object(flow_builder, "render_graph", lambda dot, file_path: f"{file_path}.dot"), \
+                mock.patch.object(flow_builder, "put_payload", lambda contact_id, payload: "payload:test"):
+            _, _, _, error_count = flow_builder.process_sub_flow(
+                "flow", Digraph(), [], {}, "MainFlow", "node-1", make_contact_logs(),
+                CONTACT_ID, make_lambda_logs(), 0, "dev", "ap-northeast-2"
+            )
+        return error_count
+
+    def test_loop_compression_keeps_error_count(self):
+        """반복 구간 압축 여부와 관계없이 block Error 4 개 + Lambda Error 3 개"""
+        self.assertEqual(self.count_errors(loop_compression=False), 7)
+        self.assertEqual(self.count_errors(loop_compression=True), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
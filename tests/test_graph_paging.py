@@ -0,0 +1,73 @@
+import unittest
+
+from graphviz import Digraph
+
+from utils import apply_rank
+from graph_labels import add_edges
+from grid_layout import get_statement_node_id
+from graph_paging import paginate_graph, is_page_ref, get_page_number
+from graph_render import get_page_file_path
+
+
+def make_graph(node_count, extra_nodes=()):
+    dot = Digraph(comment="paging")
+    dot.attr(rankdir="LR", label="Flow", labelloc="t")
+    nodes = []
+    for index in range(node_count):
+        node_id = f"node_{index}"
+        dot.node(node_id, label=f"Block {index}")
+        nodes.append(node_id)
+    for node_id in extra_nodes:
+        dot.node(node_id, label=node_id)
+    return dot, nodes
+
+
+def declared_nodes(dot):
+    return list(dict.fromkeys(node_id for node_id in map(get_statement_node_id, dot.body) if node_id is not None))
+
+
+class PaginateGraphTest(unittest.TestCase):
+
+    def test_small_graph_matches_single_graph(self):
+        """node_budget 이하이면 페이지 분할 전과 같은 그래프"""
+        expected_dot, nodes = make_graph(5)
+        expected_dot = add_edges(expected_dot, nodes)
+        apply_rank(expected_dot, nodes)
+
+        dot, nodes = make_graph(5)
+        dot = paginate_graph(dot, nodes, node_budget=5)
+
+        self.assertEqual(dot.source, expected_dot.source)
+        self.assertFalse(getattr(dot, "pages", None))
+
+    def test_pages_keep_node_order(self):
+        """각 node 는 한 페이지에만, 원래 순서대로 나뉘고 페이지 이동 node 로 연결"""
+        dot, nodes = make_graph(7, extra_nodes=["xray_detail"])
+        dot = paginate_graph(dot, nodes, node_budget=3)
+
+        self.assertEqual(len(dot.pages), 3)
+        page_nodes = [
+            [node_id for node_id in declared_nodes(page) if node_id.startswith("node_")]
+            for page in dot.pages
+        ]
+        self.assertEqual(page_nodes, [nodes[0:3], nodes[3:6], nodes[6:7]])
+
+        for page in dot.pages:
+            self.assertIn('label=Flow', page.source)
+        self.assertIn("xray_detail", declared_nodes(dot.pages[0]))
+
+        middle = dot.pages[1].source
+        self.assertIn('URL="page:1"', middle)
+        self.assertIn('URL="page:3"', middle)
+        self.assertNotIn("page_3_next", dot.pages[2].source)
+
+    def test_page_refs(self):
+        self.assertTrue(is_page_ref("page:2"))
+        self.assertFalse(is_page_ref("./virtual_env/flow_c.dot"))
+        self.assertEqual(get_page_number("page:12"), 12)
+        self.assertEqual(get_page_file_path("./virtual_env/flow_c", 1), "./virtual_env/flow_c")
+        self.assertEqual(get_page_file_path("./virtual_env/flow_c", 2), "./virtual_env/flow_c_p2")
+
+
+if __name__ == "__main__":
+    unittest.main()
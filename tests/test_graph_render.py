@@ -0,0 +1,65 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+
+from graph_render import RenderManifest, BuildCache
+
+
+class ManifestSaveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def run_threads(self, target, count=8):
+        errors = []
+
+        def run(number):
+            try:
+                target(number)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(number,)) for number in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_render_manifest_concurrent_save(self):
+        """여러 thread 가 동시에 기록 / 저장해도 모든 기록이 파일에 남음"""
+        path = os.path.join(self.directory.name, "render_manifest.json")
+        manifest = RenderManifest(path)
+
+        def record_and_save(number):
+            for index in range(50):
+                manifest.record(f"graph_{number}_{index}.dot", f"hash_{number}_{index}")
+                manifest.save()
+
+        self.run_threads(record_and_save)
+
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 8 * 50)
+        self.assertEqual(os.listdir(self.directory.name), ["render_manifest.json"])
+
+    def test_build_cache_concurrent_save(self):
+        path = os.path.join(self.directory.name, "build_manifest.json")
+        cache = BuildCache(path)
+
+        def record_and_save(number):
+            for index in range(50):
+                cache.record(f"contact:{number}_{index}", "hash", [], {"nodes": [index]})
+                cache.save()
+
+        self.run_threads(record_and_save)
+
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 8 * 50)
+        self.assertEqual(BuildCache(path).lookup("contact:3_7", "hash")["output"], {"nodes": [7]})
+
+
+if __name__ == "__main__":
+    unittest.main()
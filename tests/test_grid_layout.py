@@ -0,0 +1,95 @@
+import re
+import random
+import unittest
+
+from graphviz import Digraph
+
+from utils import apply_rank, COLS_NUM
+from grid_layout import get_statement_node_id, get_node_labels, estimate_label_size
+
+POS_PATTERN = re.compile(r'^\s*(\S+) \[pos="([-\d.]+),([-\d.]+)!"\]')
+RANK_PATTERN = re.compile(r"\{rank=same; (.*)\}")
+
+
+def make_graph(rng, count):
+    dot = Digraph()
+    dot.attr(rankdir="LR", label="Flow")
+    nodes = []
+    for index in range(count):
+        node_id = f"node_{index}"
+        text = "<br/>".join("가나다 abc" * rng.randint(1, 4) for _ in range(rng.randint(1, 4)))
+        dot.node(node_id, label=f"<<table><tr><td>{text}</td></tr></table>>", shape="plaintext")
+        nodes.append(node_id)
+    return dot, nodes
+
+
+def old_rank_groups(nodes):
+    """dot 엔진 배치에서 사용하던 rank=same 묶음 (열마다 위에서 아래 순서)"""
+    dot = Digraph()
+    apply_rank(dot, nodes, grid=False)
+    return [[node_id.strip('"') for node_id in RANK_PATTERN.search(statement).group(1).split()] for statement in dot.body]
+
+
+def grid_positions(dot):
+    positions = {}
+    for statement in dot.body:
+        found = POS_PATTERN.match(statement)
+        if found:
+            positions[found.group(1)] = (float(found.group(2)), float(found.group(3)))
+    return positions
+
+
+class ApplyRankTest(unittest.TestCase):
+
+    def test_grid_matches_old_rank_groups(self):
+        """격자 좌표가 이전 rank=same 배치와 같은 열 / 줄 순서를 유지하고 node 끼리 겹치지 않음"""
+        rng = random.Random(36)
+        for count in list(range(1, 2 * COLS_NUM + 2)) + [rng.randint(20, 60) for _ in range(5)]:
+            dot, nodes = make_graph(rng, count)
+            apply_rank(dot, nodes)
+            positions = grid_positions(dot)
+
+            self.assertEqual(dot.engine, "neato")
+            self.assertEqual(set(positions), set(nodes))
+
+            groups = old_rank_groups(nodes)
+            column_x = []
+            for group in groups:
+                xs = {positions[node_id][0] for node_id in group}
+                self.assertEqual(len(xs), 1)
+                column_x.append(xs.pop())
+                ys = [positions[node_id][1] for node_id in group]
+                self.assertEqual(ys, sorted(ys, reverse=True))
+                self.assertEqual(len(set(ys)), len(ys))
+            self.assertEqual(column_x, sorted(column_x))
+
+            labels = get_node_labels(dot)
+            boxes = []
+            for node_id in nodes:
+                (x, y), (width, height) = positions[node_id], estimate_label_size(labels[node_id])
+                boxes.append((x - width / 2, x + width / 2, y - height / 2, y + height / 2))
+            for i, a in enumerate(boxes):
+                for b in boxes[i + 1:]:
+                    self.assertTrue(a[1] <= b[0] or b[1] <= a[0] or a[3] <= b[2] or b[3] <= a[2])
+
+    def test_without_grid_keeps_old_rank(self):
+        """grid=False 이거나 nodes 외의 node 가 있으면 이전과 같이 dot 엔진의 rank=same 배치"""
+        dot, nodes = make_graph(random.Random(1), 7)
+        apply_rank(dot, nodes, grid=False)
+        self.assertEqual(dot.engine, "dot")
+        self.assertFalse(grid_positions(dot))
+
+        dot, nodes = make_graph(random.Random(1), 7)
+        dot.node("xray_detail", label="X-Ray")
+        apply_rank(dot, nodes)
+        self.assertEqual(dot.engine, "dot")
+        self.assertEqual(sum(1 for statement in dot.body if "rank=same" in statement), COLS_NUM)
+
+    def test_graph_attributes_are_not_nodes(self):
+        for statement in ['\tgraph [rankdir=LR]', '\trankdir=LR', '\tnode [shape=box]', '\ta -> b [label=0]']:
+            self.assertIsNone(get_statement_node_id(statement))
+        self.assertEqual(get_statement_node_id('\t"node 1" [label="A"]'), "node 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+import json
+import bisect
+import random
+import unittest
+from datetime import datetime
+
+from log_record import LogEntry
+from timestamps import format_epoch_ms, to_epoch_ms
+from lambda_index import InvocationIndex, LambdaLogs, as_lambda_logs
+from utils import get_hook_trace_index
+
+CONTACT_IDS = ["contact-1", "contact-2"]
+PARAMETER_SETS = [
+    {"menu": "1"},
+    {"menu": "2", "id&v": "y"},
+    {"menu": "1", "varsConfig": {"a": 1}},
+    {"menu": "1", "varsConfig": {"b": 2}},
+]
+
+
+def format_timestamp(epoch_ms):
+    return format_epoch_ms(epoch_ms).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def old_matches(function_logs, contact_id, log_parameters):
+    """fingerprint 인덱스 이전의 block ↔ Lambda 로그 비교 (로그마다 JSON 직렬화)"""
+    target_logs = []
+    for l in function_logs:
+        if l.get("ContactId") != contact_id:
+            continue
+        message = l.get("message", "")
+        if "parameter" in message:
+            func_param = json.dumps(l.get("parameters"), sort_keys=True).replace("id&v", "idnv")
+            log_param = json.dumps(log_parameters, sort_keys=True).replace("id&v", "idnv")
+            if log_param == func_param:
+                target_logs.append(("parameter", l))
+        elif "Event" in message:
+            if l.get("event"):
+                func_param = l["event"]["Details"]["Parameters"]
+                log_param = log_parameters
+                if func_param.get('varsConfig') is not None and log_param.get('varsConfig') is not None:
+                    func_param = dict(func_param)
+                    log_param = dict(log_param)
+                    del func_param['varsConfig']
+                    del log_param['varsConfig']
+                if json.dumps(log_param, sort_keys=True) == json.dumps(func_param, sort_keys=True):
+                    target_logs.append(("event", l))
+    return target_logs
+
+
+def old_find(function_logs, contact_id, log_parameters, ts):
+    """일치하는 로그 중 시간 차이가 가장 작은 로그 (같으면 parameter 로그, 이른 로그 우선)"""
+    target_logs = old_matches(function_logs, contact_id, log_parameters)
+    if not target_logs:
+        return None
+
+    def distance(match):
+        kind, l = match
+        timestamp = to_epoch_ms(l["timestamp"])
+        return abs(timestamp - ts), kind != "parameter", timestamp
+
+    return min(target_logs, key=distance)[1]
+
+
+def parse_timestamp(timestamp):
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+def old_find_lex_xray_timestamp(lex_entry, hook_logs):
+    """정렬된 인덱스 이전의 Lex 대화 → Hook trace 조회 (대화마다 Hook 로그 전체를 정렬)"""
+    hook_entries = sorted(
+        [
+            (parse_timestamp(entry["timestamp"]), entry["xray_trace_id"])
+            for entry in hook_logs
+            if "timestamp" in entry and "xray_trace_id" in entry
+        ],
+        key=lambda x: x[0]
+    )
+    hook_timestamps = [entry[0] for entry in hook_entries]
+    hook_trace_ids = [entry[1] for entry in hook_entries]
+
+    lex_time = parse_timestamp(lex_entry["timestamp"])
+
+    pos = bisect.bisect_left(hook_timestamps, lex_time)
+    candidates = []
+    if pos < len(hook_timestamps):
+        candidates.append((abs(hook_timestamps[pos] - lex_time), hook_trace_ids[pos]))
+    if pos > 0:
+        candidates.append((abs(hook_timestamps[pos - 1] - lex_time), hook_trace_ids[pos - 1]))
+
+    if candidates:
+        return min(candidates, key=lambda x: x[0])[1]
+    return ""
+
+
+def make_function_logs(rng, count):
+    timestamps = rng.sample(range(0, 600000), count)
+    function_logs = []
+    for ts in timestamps:
+        parameters = dict(rng.choice(PARAMETER_SETS))
+        log = {"ContactId": rng.choice(CONTACT_IDS), "timestamp": format_timestamp(ts), "xray_trace_id": f"trace-{ts}"}
+        if rng.random() < 0.5:
+            log.update(message="parameter", parameters=parameters)
+        else:
+            log.update(message="Event", event={"Details": {"Parameters": parameters}})
+        function_logs.append(LogEntry(log))
+    return function_logs
+
+
+class InvocationIndexTest(unittest.TestCase):
+
+    def test_matches_old_lookup(self):
+        """무작위 Lambda 로그에서 이전 비교 방식과 같은 호출 로그 선택"""
+        rng = random.Random(26)
+        for _ in range(30):
+            function_logs = make_function_logs(rng, rng.randint(0, 40))
+            index = InvocationIndex(function_logs)
+            for _ in range(40):
+                contact_id = rng.choice(CONTACT_IDS)
+                log_parameters = dict(rng.choice(PARAMETER_SETS))
+                ts = rng.randint(0, 600000)
+                self.assertIs(
+                    index.find(contact_id, log_parameters, ts),
+                    old_find(function_logs, contact_id, log_parameters, ts)
+                )
+
+    def test_skips_malformed_logs(self):
+        """필드나 timestamp 가 없는 로그는 인덱스에서 제외하고 나머지는 그대로 연결"""
+        valid = LogEntry({
+            "ContactId": "contact-1", "message": "parameter", "parameters": {"menu": "1"},
+            "timestamp": "2026-01-01T00:00:01.000Z",
+        })
+        function_logs = [
+            LogEntry({"ContactId": "contact-1", "message": "parameter", "parameters": {"menu": "1"}}),
+            LogEntry({"ContactId": "contact-1", "message": "parameter", "parameters": {"menu": "1"}, "timestamp": "invalid"}),
+            LogEntry({"ContactId": "contact-1", "message": "Event", "event": {"Details": {}}, "timestamp": "2026-01-01T00:00:00.000Z"}),
+            LogEntry({"ContactId": "contact-1", "message": "Event", "event": "raw", "timestamp": "2026-01-01T00:00:00.000Z"}),
+            valid,
+        ]
+        index = InvocationIndex(function_logs)
+        self.assertIs(index.find("contact-1", {"menu": "1"}, to_epoch_ms("2026-01-01T00:00:00.000Z")), valid)
+
+    def test_index_built_once_per_lambda_logs(self):
+        lambda_logs = as_lambda_logs({"fn": make_function_logs(random.Random(1), 5)})
+
+        self.assertIsInstance(lambda_logs, LambdaLogs)
+        self.assertIs(as_lambda_logs(lambda_logs), lambda_logs)
+        self.assertIs(lambda_logs.invocation_index("fn"), lambda_logs.invocation_index("fn"))
+        self.assertIsNone(as_lambda_logs(None))
+
+
+class NearestTimestampIndexTest(unittest.TestCase):
+
+    def make_hook_logs(self, rng):
+        hook_logs = []
+        for number in range(rng.randint(0, 30)):
+            entry = {"timestamp": format_timestamp(rng.randrange(0, 60000, 5)), "xray_trace_id": f"trace-{number}"}
+            if rng.random() < 0.1:
+                del entry[rng.choice(["timestamp", "xray_trace_id"])]
+            hook_logs.append(LogEntry(entry))
+        return hook_logs
+
+    def test_matches_old_lookup(self):
+        """같은 거리의 두 Hook 로그, 같은 timestamp 를 포함해 이전 조회와 같은 trace 선택"""
+        rng = random.Random(46)
+        for _ in range(300):
+            hook_logs = self.make_hook_logs(rng)
+            hook_index = get_hook_trace_index(hook_logs)
+            for _ in range(20):
+                lex_entry = LogEntry({"timestamp": format_timestamp(rng.randrange(0, 60000, 5))})
+                self.assertEqual(
+                    hook_index.find(to_epoch_ms(lex_entry["timestamp"]), ""),
+                    old_find_lex_xray_timestamp(lex_entry, hook_logs)
+                )
+
+    def test_find_all_matches_find(self):
+        """정렬된 목록(두 포인터 병합)과 정렬되지 않은 목록 모두 항목별 find 와 같음"""
+        rng = random.Random(146)
+        for _ in range(300):
+            hook_index = get_hook_trace_index(self.make_hook_logs(rng))
+            timestamps = [rng.randrange(0, 60000, 5) for _ in range(rng.randint(0, 20))]
+            for targets in (sorted(timestamps), timestamps):
+                self.assertEqual(
+                    hook_index.find_all(targets, ""),
+                    [hook_index.find(ts, "") for ts in targets]
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
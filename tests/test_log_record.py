@@ -0,0 +1,50 @@
+import json
+import unittest
+
+from log_record import LogRecord, json_default
+
+
+def make_record():
+    return LogRecord.from_message(json.dumps({
+        "ContactId": "contact-1",
+        "ContactFlowModuleType": "SetAttributes",
+        "Timestamp": "2026-01-01T00:00:00.000Z",
+        "Parameters": {"Key": "language", "Value": "ko"},
+        "ModuleExecutionStack": [],
+    }))
+
+
+class LogRecordTest(unittest.TestCase):
+
+    def test_serialize_keeps_raw_payload(self):
+        """JSON 저장 후에도 나머지 필드를 decode 한 상태로 보관하지 않음"""
+        record = make_record()
+        text = json.dumps([record], default=json_default)
+
+        self.assertEqual(json.loads(text)[0]["Parameters"], {"Key": "language", "Value": "ko"})
+        self.assertIsNotNone(record._raw)
+        self.assertIsNone(record._cold)
+
+    def test_nested_update_survives_serialize(self):
+        """한 번 접근한 나머지 필드의 수정 내용이 이후 조회와 저장에 반영"""
+        record = make_record()
+        record["Parameters"]["Value"] = "en"
+        record["node_id"] = 3
+
+        self.assertEqual(record["Parameters"]["Value"], "en")
+        self.assertEqual(record.to_dict()["Parameters"]["Value"], "en")
+        self.assertEqual(record.to_dict()["node_id"], 3)
+
+    def test_field_added_before_decode(self):
+        """decode 전에 추가한 필드가 원본 필드와 함께 유지"""
+        record = make_record()
+        record["extra"] = "value"
+        json.dumps(record, default=json_default)
+
+        self.assertEqual(record["extra"], "value")
+        self.assertEqual(record["ModuleExecutionStack"], [])
+        self.assertEqual(len(record), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
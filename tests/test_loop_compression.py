@@ -0,0 +1,81 @@
+import random
+import unittest
+
+from loop_compression import LoopSegment, find_loops, compress_sequence
+
+
+def reference_loops(keys, min_repeat, max_period):
+    """앞에서부터 구간을 직접 비교해 반복 구간을 찾는 기준 구현"""
+    loops = []
+    start = 0
+    while start < len(keys):
+        best = None
+        for period in range(1, max_period + 1):
+            pattern = keys[start:start + period]
+            if len(pattern) < period or None in pattern:
+                continue
+            repeat = 0
+            while keys[start + repeat * period:start + (repeat + 1) * period] == pattern:
+                repeat += 1
+            if repeat >= min_repeat and (best is None or period * repeat > best[0] * best[1]):
+                best = (period, repeat)
+        if best:
+            loops.append((start, best[0], best[1]))
+            start += best[0] * best[1]
+        else:
+            start += 1
+    return loops
+
+
+def flatten(segments):
+    items = []
+    for segment in segments:
+        if isinstance(segment, LoopSegment):
+            items.extend(segment.items)
+        else:
+            items.append(segment)
+    return items
+
+
+class FindLoopsTest(unittest.TestCase):
+
+    def test_block_sequence(self):
+        """재시도 메뉴처럼 같은 block 묶음이 반복된 구간"""
+        keys = ["start", "menu", "input", "menu", "input", "menu", "input", "end"]
+        self.assertEqual(find_loops(keys, min_repeat=3, max_period=4), [(1, 2, 3)])
+
+    def test_prefers_longest_coverage_then_shorter_period(self):
+        self.assertEqual(find_loops(["a"] * 6, min_repeat=3, max_period=3), [(0, 1, 6)])
+        self.assertEqual(find_loops(["a", "b"] * 3 + ["a"], min_repeat=3, max_period=3), [(0, 2, 3)])
+
+    def test_none_key_breaks_loop(self):
+        """key 가 None 인 항목(MOD_ 로그)은 반복 구간에 포함하지 않음"""
+        self.assertEqual(find_loops([None, None, None, "a", "a"], min_repeat=3, max_period=2), [])
+        self.assertEqual(find_loops(["a", "a", None, "a", "a"], min_repeat=3, max_period=2), [])
+
+    def test_matches_reference(self):
+        rng = random.Random(37)
+        for _ in range(3000):
+            keys = [rng.choice("abc") if rng.random() > 0.05 else None for _ in range(rng.randint(0, 30))]
+            min_repeat = rng.randint(2, 4)
+            max_period = rng.randint(1, 6)
+            self.assertEqual(
+                find_loops(keys, min_repeat=min_repeat, max_period=max_period),
+                reference_loops(keys, min_repeat, max_period)
+            )
+
+    def test_compress_keeps_every_item_in_order(self):
+        """압축 결과를 펼치면 원래 로그 순서와 같음"""
+        rng = random.Random(7)
+        for _ in range(500):
+            items = list(enumerate(rng.choice("ab") for _ in range(rng.randint(0, 40))))
+            segments = compress_sequence(items, key=lambda item: item[1])
+            self.assertEqual(flatten(segments), items)
+            for segment in segments:
+                if isinstance(segment, LoopSegment):
+                    keys = [[key for _, key in iteration] for iteration in segment.iterations]
+                    self.assertTrue(all(iteration == keys[0] for iteration in keys))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from task_graph import TaskGraph
+
+
+def make_graph():
+    return TaskGraph({"io": 4, "cpu": 2})
+
+
+def quiet_run(graph):
+    """실패 작업의 traceback 출력 없이 실행"""
+    with redirect_stdout(StringIO()):
+        return graph.run()
+
+
+class TaskGraphTest(unittest.TestCase):
+
+    def test_matches_sequential_order(self):
+        """무작위 DAG 결과가 입력 순서대로 하나씩 계산한 결과와 같음"""
+        rng = random.Random(50)
+        for _ in range(50):
+            count = rng.randint(1, 40)
+            deps = {i: rng.sample(range(i), rng.randint(0, min(i, 3))) for i in range(count)}
+
+            expected = {}
+            for i in range(count):
+                expected[f"t{i}"] = i + sum(expected[f"t{d}"] * (position + 1) for position, d in enumerate(deps[i]))
+
+            graph = make_graph()
+            # 입력 작업보다 나중 작업을 먼저 추가 (아직 없는 이름에 의존)
+            for i in reversed(range(count)):
+                graph.add(
+                    f"t{i}",
+                    lambda *results, i=i: i + sum(result * (position + 1) for position, result in enumerate(results)),
+                    [f"t{d}" for d in deps[i]],
+                    pool=rng.choice(["io", "cpu"]),
+                )
+            self.assertEqual(graph.run(), expected)
+
+    def test_add_while_running(self):
+        graph = make_graph()
+
+        def fetch():
+            graph.add("build", lambda logs: logs + ["built"], ["fetch"])
+            return ["log"]
+
+        graph.add("fetch", fetch, pool="io")
+        self.assertEqual(graph.run()["build"], ["log", "built"])
+
+    def test_failure_skips_dependents_only(self):
+        """실패한 작업을 기다리는 작업만 실행하지 않고 나머지는 계속 실행"""
+        ran = []
+        graph = make_graph()
+        graph.add("fetch", lambda: 1 / 0, pool="io")
+        graph.add("build", lambda value: ran.append("build"), ["fetch"])
+        graph.add("render", lambda value: ran.append("render"), ["build"])
+        graph.add("other", lambda: ran.append("other") or "ok")
+
+        results = quiet_run(graph)
+        graph.add("late", lambda value: ran.append("late"), ["fetch"])
+
+        self.assertEqual(results, {"other": "ok"})
+        self.assertEqual(ran, ["other"])
+
+    def test_missing_dependency_fails(self):
+        graph = make_graph()
+        graph.add("build", lambda logs: logs, ["never-added"])
+        graph.add("ok", lambda: "ok")
+        self.assertEqual(quiet_run(graph), {"ok": "ok"})
+
+    def test_duplicate_name_is_ignored(self):
+        graph = make_graph()
+        graph.add("fetch", lambda: "first")
+        graph.add("fetch", lambda: "second")
+        self.assertEqual(graph.run(), {"fetch": "first"})
+
+    def test_pool_worker_limit(self):
+        """작업 종류(pool) 별 동시 실행 수 제한"""
+        lock = threading.Lock()
+        active = {"io": 0, "cpu": 0}
+        peak = {"io": 0, "cpu": 0}
+
+        def work(pool):
+            with lock:
+                active[pool] += 1
+                peak[pool] = max(peak[pool], active[pool])
+            time.sleep(0.01)
+            with lock:
+                active[pool] -= 1
+
+        graph = make_graph()
+        for i in range(12):
+            pool = "io" if i % 2 else "cpu"
+            graph.add(f"t{i}", lambda pool=pool: work(pool), pool=pool)
+        graph.run()
+
+        self.assertLessEqual(peak["io"], 4)
+        self.assertLessEqual(peak["cpu"], 2)
+
+    def test_system_exit_reraised(self):
+        """작업 안의 sys.exit 는 run() 을 호출한 thread 에서 다시 발생"""
+        def exit_task():
+            raise SystemExit(1)
+
+        graph = make_graph()
+        graph.add("exit", exit_task)
+        with self.assertRaises(SystemExit):
+            graph.run()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import random
+import unittest
+
+from xray_segments import TraceSegments
+
+
+def old_get_xray_parent_id(parent_id, xray_data):
+    """segment map 이전의 parent segment 조회 (trace 전체를 두 번 순회)"""
+    invocation_id = None
+
+    if parent_id:
+        for segment in xray_data:
+            for i in segment.get("subsegments", []):
+                if i["id"] == parent_id:
+                    invocation_id = segment["parent_id"]
+                    break
+
+    if invocation_id:
+        for segment in xray_data:
+            for j in segment.get("subsegments", []):
+                if j["id"] == invocation_id:
+                    return segment["id"]
+
+    return None
+
+
+def make_documents(rng):
+    """subsegment id 가 여러 segment 에 겹쳐 나타날 수 있는 무작위 trace"""
+    subsegment_ids = [f"sub-{i}" for i in range(rng.randint(1, 8))]
+    documents = []
+    for number in range(rng.randint(1, 8)):
+        documents.append({
+            "id": f"segment-{number}",
+            "parent_id": rng.choice(subsegment_ids + [None]),
+            "subsegments": [{"id": sub_id} for sub_id in rng.sample(subsegment_ids, rng.randint(0, len(subsegment_ids)))],
+        })
+    return documents, subsegment_ids
+
+
+class TraceSegmentsTest(unittest.TestCase):
+
+    def test_invoker_matches_old_lookup(self):
+        """무작위 trace 에서 이전 get_xray_parent_id 와 같은 segment id"""
+        rng = random.Random(43)
+        for _ in range(2000):
+            documents, subsegment_ids = make_documents(rng)
+            trace_segments = TraceSegments(documents)
+            for parent_id in subsegment_ids + [None, "missing"]:
+                self.assertEqual(
+                    trace_segments.get_invoker_id(parent_id),
+                    old_get_xray_parent_id(parent_id, documents)
+                )
+
+    def test_lambda_invocation_chain(self):
+        """function segment → Lambda service segment → 호출한 segment 순으로 연결"""
+        documents = [
+            {"id": "caller", "subsegments": [{"id": "invoke"}]},
+            {"id": "lambda-service", "parent_id": "invoke", "subsegments": [{"id": "attempt"}]},
+            {"id": "function", "parent_id": "attempt", "subsegments": []},
+        ]
+        trace_segments = TraceSegments(documents)
+
+        self.assertEqual(trace_segments.get_invoker_id("attempt"), "caller")
+        self.assertIs(trace_segments.get_caller(documents[2]), documents[1])
+        self.assertIsNone(trace_segments.get_invoker_id("invoke"))
+
+
+if __name__ == "__main__":
+    unittest.main()
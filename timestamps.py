@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from log_record import has_derived, set_derived, get_derived
+
+# 이 개수 이상이면 numpy datetime64 로 일괄 파싱
+VECTORIZE_MIN_BATCH = 64
+
+
+def to_epoch_ms(timestamp):
+    """ISO 8601 timestamp 문자열을 정수 epoch milliseconds 로 변환 (timezone 없으면 UTC)"""
+    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def format_epoch_ms(epoch_ms):
+    """epoch milliseconds 를 UTC datetime 으로 변환"""
+    return datetime.fromtimestamp(epoch_ms // 1000, tz=timezone.utc).replace(microsecond=(epoch_ms % 1000) * 1000)
+
+
+def _epoch_ms_name(key):
+    """timestamp 필드별 파생 값 이름"""
+    return f"epoch_ms:{key}"
+
+
+def attach_epoch_ms(records, key="Timestamp"):
+    """레코드 목록의 key 필드 epoch milliseconds 를 한 번에 계산해 보관 (로그 필드에는 추가하지 않음)"""
+    name = _epoch_ms_name(key)
+    targets = [r for r in records if r.get(key) and not has_derived(r, name)]
+    if not targets:
+        return records
+
+    values = [r[key] for r in targets]
+    if len(values) >= VECTORIZE_MIN_BATCH and all(v.endswith('Z') for v in values):
+        try:
+            parsed = np.array([v[:-1] for v in values], dtype='datetime64[ms]').astype(np.int64).tolist()
+        except ValueError:
+            parsed = [to_epoch_ms(v) for v in values]
+    else:
+        parsed = [to_epoch_ms(v) for v in values]
+
+    for record, epoch_ms in zip(targets, parsed):
+        set_derived(record, name, epoch_ms)
+    return records
+
+
+def get_epoch_ms(record, key="Timestamp"):
+    """레코드 key 필드의 epoch milliseconds 반환 (ingest 를 거치지 않은 레코드는 여기서 계산해 보관)"""
+    return get_derived(record, _epoch_ms_name(key), lambda: to_epoch_ms(record[key]))
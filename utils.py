@@ -5,17 +5,21 @@ import time
 import pytz
 import boto3
 import os
-import subprocess
-from dateutil import parser
-import bisect
 from datetime import datetime, timedelta
 from collections import defaultdict
+from collections.abc import Mapping
 
 from describe_flow import get_contact_flow, \
-                        get_contact_flow_module
+                        get_contact_flow_module, get_describe_path
+from artifact_bus import put_artifact, is_artifact_loaded
 
 from fetch_data_from_s3 import decompress_datadog_logs
-from constants import GROUPED_CONTACT_FLOW_NAMES
+from lambda_index import LambdaLogs, NearestTimestampIndex
+from timestamps import attach_epoch_ms, get_epoch_ms
+from error_rules import classify_records
+from log_record import LogRecord, LogEntry
+from grid_layout import apply_grid_positions
+from constants import GROUPED_CONTACT_FLOW_NAMES, GRID_LAYOUT_FLAG
 
 # 그래프에서 한 줄에 표시할 노드 수 
 COLS_NUM = 5
@@ -36,7 +40,7 @@ def check_json_file_exists(directory):
 # Util
 def generate_node_ids(logs,sort=True):
     if sort:
-        logs.sort(key=lambda log: log['Timestamp'])  # timestamp 기준 정렬
+        logs.sort(key=get_epoch_ms)  # timestamp 기준 정렬
     flow_indices = defaultdict(int)
     last_flow_name = None  # 마지막 유효한 Entry 노드의 flow_name 저장
     last_node_id = None  # 마지막 Entry 기반 node_id 저장
@@ -57,6 +61,16 @@ def generate_node_ids(logs,sort=True):
 
     return logs
 
+def group_logs_by_flow(logs):
+    """한 번의 순회로 ContactFlowName 별 로그 목록과 ContactFlowId → ContactFlowName 인덱스 생성"""
+    flow_groups = defaultdict(list)
+    flow_names = {}
+    for log in logs:
+        flow_name = log['ContactFlowName']
+        flow_groups[flow_name].append(log)
+        flow_names.setdefault(log.get('ContactFlowId'), flow_name)
+    return flow_groups, flow_names
+
 def valid_uuid(uuid):
     if not uuid:
         return False
@@ -75,9 +89,32 @@ def sanitize_label(label):
     # 유효하지 않은 ASCII 제어 문자 제거 (0x00~0x1F 및 0x7F)
     return re.sub(r'[\x00-\x1F\x7F]', '', label)
 
-def fetch_logs(contact_id, initiation_timestamp, region, log_group, env, instance_id):
+def fetch_flow_definition(contact_flow_id, region):
+    """이번 실행에서 아직 가져오지 않은 Flow / Module 정의 조회"""
+    if 'contact-flow' in contact_flow_id:
+        if not is_artifact_loaded(get_describe_path(contact_flow_id)):
+            get_contact_flow(contact_flow_id, region)
+    elif 'flow-module' in contact_flow_id:
+        if not is_artifact_loaded(get_describe_path(contact_flow_id)):
+            get_contact_flow_module(contact_flow_id, region)
+
+
+def get_lambda_function_name(lambda_log_group):
+    return lambda_log_group.split("/")[-1]
+
+
+def merge_lambda_logs(lambda_logs):
+    """함수별 Lambda 로그 (common-if 는 async-if 로그 포함)"""
+    async_logs = lambda_logs.get('flow-idnv-async-if', [])
+    if async_logs:
+        lambda_logs['flow-idnv-common-if'] = lambda_logs.get('flow-idnv-common-if', []) + async_logs
+    return LambdaLogs(lambda_logs)
+
+
+def query_contact_logs(contact_id, initiation_timestamp, region, log_group, env, instance_id):
     """
-    CloudWatch Logs에서 ContactId에 해당하는 로그를 가져옵니다.
+    CloudWatch Logs에서 ContactId에 해당하는 Contact Flow 로그를 가져옵니다.
+    (로그, Flow ID 목록, Lambda 로그 그룹 목록, S3 백업에서 가져온 Lambda 로그 또는 None) 반환
     """
     cloudwatch_client = boto3.client("logs", region_name=region)
     query = f"""
@@ -110,6 +147,14 @@ def fetch_logs(contact_id, initiation_timestamp, region, log_group, env, instanc
             print("S3에 백업 된 데이터를 불러옵니다...S3에서 가져온 데이터는 Lambda Xray Trace기능이 없습니다.(추후 개발 예정)")
             print(f"contact id : {contact_id}")
             datadog_logs, datadog_lambda_logs = decompress_datadog_logs(env,contact_id,instance_id,region)
+            datadog_logs = [LogRecord(l) for l in datadog_logs]
+            classify_records(attach_epoch_ms(datadog_logs))
+            datadog_lambda_logs = {
+                function_name: [LogEntry(l) for l in function_logs]
+                for function_name, function_logs in datadog_lambda_logs.items()
+            }
+            for function_logs in datadog_lambda_logs.values():
+                classify_records(attach_epoch_ms(function_logs, "timestamp"))
             datadog_logs = generate_node_ids(datadog_logs, False)
             # datadog_lambda_logs = []
             result_logs = []
@@ -125,22 +170,9 @@ def fetch_logs(contact_id, initiation_timestamp, region, log_group, env, instanc
                 # if json_value.get("xray_trace_id") and json_value.get("ContactId") == contact_id:
                 #     datadog_lambda_logs.append(json_value)
 
-            for contact_flow_id in contact_flow_ids:
-                if 'contact-flow' in contact_flow_id:
-                    jsonfile_name = f"./virtual_env/describe_contact_flow_{contact_flow_id}.json"
-
-                    if not os.path.isfile(jsonfile_name):
-                        get_contact_flow(contact_flow_id, region)
-                elif 'flow-module' in contact_flow_id:
-                    jsonfile_name = f"./virtual_env/describe_flow_module_{contact_flow_id}.json"
-
-                    if not os.path.isfile(jsonfile_name):
-                        get_contact_flow_module(contact_flow_id, region)
-
-
             # print(datadog_lambda_logs)
 
-            return datadog_logs, datadog_lambda_logs, contact_flow_ids
+            return datadog_logs, contact_flow_ids, set(), LambdaLogs(datadog_lambda_logs)
         else:
             print(f"Error : {e}")
         sys.exit(1)
@@ -159,11 +191,12 @@ def fetch_logs(contact_id, initiation_timestamp, region, log_group, env, instanc
     for result in response["results"]:
         for field in result:
             if field["field"] == "@message":
-                json_value = json.loads(sanitize_label(field["value"]))
+                message = sanitize_label(field["value"])
+                json_value = json.loads(message)
                 
                 # 제외 contact flow 건너뛰기 
                 if json_value.get("ContactFlowName") not in EXCEPT_CONTACT_FLOW_NAME: 
-                    logs.append(json_value)
+                    logs.append(LogRecord.from_message(message, json_value))
                     contact_flow_ids.add(json_value.get("ContactFlowId"))
 
                 if "BotAliasArn" in str(json_value):
@@ -191,49 +224,17 @@ def fetch_logs(contact_id, initiation_timestamp, region, log_group, env, instanc
                             lambda_log_groups.add("/aws/lmd/aicc-chat-app/alb-chat-if")
 
 
-    # JSON 파일 저장    
+    classify_records(attach_epoch_ms(logs))
+
+    # JSON 파일 저장 (background)
     output_json_path = f"./virtual_env/contact_flow_{contact_id}.json"
-    with open(output_json_path, "w", encoding="utf-8") as json_file:
-        json.dump(logs, json_file, ensure_ascii=False, indent=4)
+    put_artifact(output_json_path, logs)
 
     print(f"JSON 파일이 저장되었습니다: {output_json_path}")
 
     logs = generate_node_ids(logs)
 
-    for contact_flow_id in contact_flow_ids:
-        if 'contact-flow' in contact_flow_id:
-            jsonfile_name = f"./virtual_env/describe_contact_flow_{contact_flow_id}.json"
-
-            if not os.path.isfile(jsonfile_name):
-                get_contact_flow(contact_flow_id, region)
-        elif 'flow-module' in contact_flow_id:
-            jsonfile_name = f"./virtual_env/describe_flow_module_{contact_flow_id}.json"
-
-            if not os.path.isfile(jsonfile_name):
-                get_contact_flow_module(contact_flow_id, region)
-
-    lambda_logs = {}
-
-    # Lambda 로그를 병렬로 가져오기
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {
-            executor.submit(fetch_lambda_logs, contact_id, initiation_timestamp, region, lg): lg.split("/")[-1]
-            for lg in lambda_log_groups
-        }
-        for future in as_completed(futures):
-            function_name = futures[future]
-            try:
-                lambda_logs[function_name] = future.result()
-            except Exception as e:
-                print(f"Error fetching lambda logs for {function_name}: {e}")
-                lambda_logs[function_name] = []
-
-    async_logs = lambda_logs.get('flow-idnv-async-if', [])
-    if async_logs:
-        lambda_logs['flow-idnv-common-if'] = lambda_logs.get('flow-idnv-common-if', []) + async_logs
-
-    return logs, lambda_logs, contact_flow_ids
+    return logs, contact_flow_ids, lambda_log_groups, None
 
 # flow-internal-handler
 def get_func_name(arn, env):
@@ -303,8 +304,7 @@ def fetch_lambda_logs(contact_id, initiation_timestamp, region, log_group):
     if "/aws/lex/" in log_group or "hook-func" in log_group:
         # JSON 파일 저장    
         output_json_path = f"./virtual_env/lex_{contact_id}.json" if "/aws/lex/" in log_group else f"./virtual_env/lex_hook_{contact_id}.json"
-        with open(output_json_path, "w", encoding="utf-8") as json_file:
-            json.dump(logs, json_file, ensure_ascii=False, indent=4)
+        put_artifact(output_json_path, logs)
 
     return logs
 
@@ -314,43 +314,10 @@ def filter_lambda_logs(response):
         for result in response["results"]:
             for field in result:
                 if field["field"] == "@message":
-                    json_value = json.loads(field["value"])
+                    json_value = LogEntry(json.loads(field["value"]))
                     logs.append(json_value)
 
-    return logs
-
-def get_xray_trace(trace_id, region):
-    # AWS CLI 명령어 실행
-    cmd = [
-        "aws", "xray", "batch-get-traces",
-        "--trace-ids", trace_id,
-        "--region", region,
-        "--output", "json"
-    ]
-    
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        return {"error": "Failed to retrieve trace", "details": result.stderr}
-
-    # JSON 파싱
-    try:
-        data = json.loads(result.stdout)
-
-        traces = [
-            json.loads(segment["Document"])
-            for trace in data.get("Traces", [])
-            for segment in trace.get("Segments", [])
-            if "Document" in segment
-        ]
-
-        with open(f"./virtual_env/batch_xray_{trace_id}.json", "w", encoding="utf-8") as f:
-            json.dump(traces, f, indent=2, ensure_ascii=False)
-
-        return traces
-    except json.JSONDecodeError:
-        return {"error": "Invalid JSON response from AWS CLI"}
-
+    return classify_records(attach_epoch_ms(logs, "timestamp"))
 
 def wrap_text(text, is_just_cut=False, max_length=72, wrap_at=25):
     """
@@ -405,8 +372,15 @@ def check_kor(text):
     else:
         return True
 
-def apply_rank(dot, nodes):
-    """Graphviz의 rank 속성 적용 (홀수 줄은 순차, 짝수 줄은 역순)"""
+def apply_rank(dot, nodes, grid=True):
+    """
+    Graphviz의 rank 속성 적용 (홀수 줄은 순차, 짝수 줄은 역순)
+    grid 가 False 면 격자 좌표(pos)를 지정하지 않음 (다른 그래프에 subgraph 로 포함되는 그래프)
+    """
+    # 격자 좌표를 직접 계산할 수 있으면 Graphviz 레이아웃 생략
+    if grid and GRID_LAYOUT_FLAG and apply_grid_positions(dot, nodes, COLS_NUM):
+        return
+
     # rank 설정 - 홀수 줄 순차, 짝수 줄 역순으로 세로로 묶음
     num_logs = len(nodes)
     cols = COLS_NUM  # 한 줄에 표시할 노드 개수 
@@ -437,7 +411,7 @@ def replace_generic_arn(log):
             v1 = pattern1.sub(r"***\2 ARN***", value)
             v2 = pattern2.sub(r"***Instance ARN***", v1)
             return v2
-        elif isinstance(value, dict):
+        elif isinstance(value, Mapping):
             return {k: replace_arn(v) for k, v in value.items()}
         elif isinstance(value, list):
             return [replace_arn(v) for v in value]
@@ -445,17 +419,6 @@ def replace_generic_arn(log):
 
     return replace_arn(log)
 
-# 밀리초 차이 계산
-def calculate_timestamp_gap(t1, t2):
-
-    fmt = "%Y-%m-%dT%H:%M:%S.%fZ"
-
-    dt1 = datetime.strptime(t1, fmt)
-    dt2 = datetime.strptime(t2, fmt)
-
-    millisecond_difference = int((dt1 - dt2).total_seconds() * 1000)
-    return millisecond_difference
-
 def get_bot_name_from_alias_arn(alias_arn: str) -> str:
     lex = boto3.client('lexv2-models')
 
@@ -477,30 +440,10 @@ def get_bot_name_from_alias_arn(alias_arn: str) -> str:
 
     return bot_info['botName']
 
-def find_lex_xray_timestamp(lex_entry,hook_logs):
-    # Hook 로그에서 timestamp와 xray_trace_id 추출
-    hook_entries = sorted(
-        [
-            (parser.isoparse(entry["timestamp"]), entry["xray_trace_id"])
-            for entry in hook_logs
-            if "timestamp" in entry and "xray_trace_id" in entry
-        ],
-        key=lambda x: x[0]
+def get_hook_trace_index(hook_logs):
+    """Hook 로그의 timestamp → xray_trace_id 인덱스 (contact 당 한 번 생성)"""
+    return NearestTimestampIndex(
+        (get_epoch_ms(entry, "timestamp"), entry["xray_trace_id"])
+        for entry in hook_logs
+        if "timestamp" in entry and "xray_trace_id" in entry
     )
-    hook_timestamps = [entry[0] for entry in hook_entries]
-    hook_trace_ids = [entry[1] for entry in hook_entries]
-
-    lex_time = parser.isoparse(lex_entry["timestamp"])
-
-    # hook 로그 중 가장 가까운 timestamp 검색
-    pos = bisect.bisect_left(hook_timestamps, lex_time)
-    candidates = []
-    if pos < len(hook_timestamps):
-        candidates.append((abs(hook_timestamps[pos] - lex_time), hook_trace_ids[pos]))
-    if pos > 0:
-        candidates.append((abs(hook_timestamps[pos - 1] - lex_time), hook_trace_ids[pos - 1]))
-    
-    if candidates:
-        closest_trace_id = min(candidates, key=lambda x: x[0])[1]
-        return closest_trace_id
-    return ""
@@ -34,6 +34,12 @@ from gi.repository import Gdk
 from . import elements
 import ast
 import json
+import functools
+
+from node_store import is_payload_ref, load_payload, load_payload_text, find_payload_refs
+from graph_render import is_xdot, get_page_file_path
+from graph_paging import is_page_ref, get_page_number
+from lazy_graphs import ensure_graph
 # See http://www.graphviz.org/pub/scm/graphviz-cairo/plugin/cairo/gvrender_cairo.c
 
 # For pygtk inspiration and guidance see:
@@ -48,6 +54,24 @@ from . import actions
 from .elements import Graph
 
 
+@functools.lru_cache(maxsize=4096)
+def _payload_search_text(ref):
+    """검색용 payload 문자열 (side-car 저장소에서 조회)"""
+    try:
+        return json.dumps(load_payload(ref), ensure_ascii=False)
+    except Exception:
+        return ref
+
+
+def _node_text(json_data):
+    """노드 URL 을 화면에 표시할 텍스트로 변환"""
+    if isinstance(json_data, dict):
+        return json.dumps(json_data, indent=4, ensure_ascii=False)
+    if is_payload_ref(json_data):
+        return load_payload_text(json_data)
+    return json_data
+
+
 class DotWidget(Gtk.DrawingArea):
     """GTK widget that draws dot graphs."""
 
@@ -138,8 +162,9 @@ class DotWidget(Gtk.DrawingArea):
     def _set_dotcode(self, dotcode, filename=None, center=True):
         # By default DOT language is UTF-8, but it accepts other encodings
         assert isinstance(dotcode, bytes)
-        xdotcode = self.run_filter(dotcode)
-            
+        # builder 가 미리 계산한 xdot 은 다시 레이아웃하지 않음
+        xdotcode = dotcode if is_xdot(dotcode) else self.run_filter(dotcode)
+
         if xdotcode is None:
             return False
         try:
@@ -725,10 +750,13 @@ class DotWindow(Gtk.Window):
             matched = element.search_text(regexp)
 
             if hasattr(element, 'url') and element.url:
-                try:
-                    url_text = json.dumps(ast.literal_eval(element.url), ensure_ascii=False)
-                except Exception:
-                    url_text = str(element.url)
+                if is_payload_ref(element.url):
+                    url_text = _payload_search_text(element.url)
+                else:
+                    try:
+                        url_text = json.dumps(ast.literal_eval(element.url), ensure_ascii=False)
+                    except Exception:
+                        url_text = str(element.url)
 
                 if regexp.search(url_text):
                     matched = True
@@ -988,6 +1016,7 @@ class TextViewWindow(Gtk.Window):
         directory = "./virtual_env/"
         result_files = []
         associated_contact_ids = [contact['ContactId'] for contact in associated_contacts['ContactSummaryList']]
+        payload_refs = find_payload_refs(keyword)
         for filename in os.listdir(directory):
             if filename == ".DS_Store":
                 continue
@@ -997,7 +1026,8 @@ class TextViewWindow(Gtk.Window):
                 try:
                     with open(file_path, "r", encoding="utf-8") as f:
                         content = f.read()
-                        if keyword in content and filename.endswith(".dot") and "main_flow" not in filename:
+                        if filename.endswith(".dot") and "main_flow" not in filename and (
+                                keyword in content or any(ref in content for ref in payload_refs)):
                             for associated_contact_id in associated_contact_ids:
                                 if associated_contact_id in content and associated_contact_id in filename:
                                     result_files.append({associated_contact_id:filename})
@@ -1065,18 +1095,37 @@ class DotWindowBase(DotWindow):
 
         super().__init__()
         self.dot_file = dot_file
+        # 페이지로 나뉜 그래프는 첫 페이지 파일로 열리므로 페이지 전환은 이 경로 기준
+        self.first_page_file = dot_file
         self.associated_contacts = associated_contacts
         self.default_keyword = keyword
         
 
-        self.dotwidget.connect('clicked', self.on_node_clicked)
-        self.open_file(self.dot_file)
+        self.dotwidget.connect('clicked', self.on_clicked)
+        # 지연 생성 모드의 서브 그래프는 처음 열릴 때 생성
+        error = ensure_graph(self.dot_file)
+        if error:
+            self.error_dialog(error)
+        else:
+            self.open_file(self.dot_file)
 
         if self.default_keyword:
             self.textentry.set_text(self.default_keyword)
             self.find_text(self.default_keyword)
 
 
+    def on_clicked(self, widget, url, event):
+        # 페이지로 나뉜 그래프의 이전/다음 노드는 같은 창에서 페이지 전환
+        if is_page_ref(url):
+            self.open_page(get_page_number(url))
+        else:
+            self.on_node_clicked(widget, url, event)
+
+    def open_page(self, page):
+        self.dot_file = get_page_file_path(self.first_page_file[:-len(".dot")], page) + ".dot"
+        print(f"페이지 열기: {self.dot_file}")
+        self.open_file(self.dot_file)
+
     def on_delete_event(self, widget, event):
         print("창이 닫혔습니다.")
         self.hide()
@@ -1095,8 +1144,14 @@ class MainDotWindow(DotWindowBase):
 
         
     def on_node_clicked(self, widget, sub_file, event):
-        
-        if ("flow" in sub_file and ".dot" in sub_file) or "transcript" in sub_file or "lex" in sub_file:
+
+        if is_payload_ref(sub_file):
+            payload = load_payload(sub_file)
+            if isinstance(payload, list): # contact attributes
+                AttributeTable(payload)
+            else:
+                TextViewDialog("노드 정보", _node_text(sub_file))
+        elif ("flow" in sub_file and ".dot" in sub_file) or "transcript" in sub_file or "lex" in sub_file:
             print(f"서브 플로우 열기: {sub_file}")
             SubDotWindow(sub_file, self.associated_contacts)
         else:
@@ -1120,10 +1175,13 @@ class SubDotWindow(DotWindowBase):
 
     def on_node_clicked(self, widget, json_data, event):
         try:
-            json_text = json.dumps(json_data, indent=4, ensure_ascii=False) if isinstance(json_data, dict) else json_data
+            json_text = _node_text(json_data)
             if json_text.startswith('./virtual_env/module_'):
                 print(f"서브 플로우 열기: {json_data}")
                 SubDotModuleWindow(json_data, self.associated_contacts)
+            elif json_text.startswith('./virtual_env/flow_'): # 반복 구간(loop) 그래프의 Flow 노드
+                print(f"서브 플로우 열기: {json_data}")
+                SubDotWindow(json_data, self.associated_contacts)
             elif json_text.startswith('./virtual_env/xray'):
                 print(f"서브 플로우 열기: {json_data}")
                 SubDotXrayWindow(json_data, self.associated_contacts)
@@ -1146,10 +1204,13 @@ class SubDotModuleWindow(DotWindowBase):
 
     def on_node_clicked(self, widget, json_data, event):
         try:
-            json_text = json.dumps(json_data, indent=4, ensure_ascii=False) if isinstance(json_data, dict) else json_data
+            json_text = _node_text(json_data)
             if json_text.startswith('./virtual_env/xray'):
                 print(f"서브 플로우 열기: {json_data}")
                 SubDotXrayWindow(json_data,self.associated_contacts)
+            elif json_text.startswith('./virtual_env/module_'): # 반복 구간(loop) 그래프
+                print(f"서브 플로우 열기: {json_data}")
+                SubDotModuleWindow(json_data, self.associated_contacts)
             else:
                 print(f"노드 클릭됨: \n{json_text}")
                 TextViewDialog("노드 정보", json_text)
@@ -1166,9 +1227,13 @@ class SubDotXrayWindow(DotWindowBase):
 
     def on_node_clicked(self, widget, json_data, event):
         try:
-            json_text = json.dumps(json_data, indent=4, ensure_ascii=False) if isinstance(json_data, dict) else json_data
-            print(f"노드 클릭됨: \n{json_text}")    
-            TextViewDialog("노드 정보", json_text)
+            json_text = _node_text(json_data)
+            if json_text.startswith('./virtual_env/xray'): # 호출 시간 waterfall 그래프
+                print(f"서브 플로우 열기: {json_data}")
+                SubDotXrayWindow(json_data, self.associated_contacts)
+            else:
+                print(f"노드 클릭됨: \n{json_text}")
+                TextViewDialog("노드 정보", json_text)
         except Exception as e:
             print(f"SubDotXrayWindow 표시 오류: {e}")
 
@@ -1182,7 +1247,7 @@ class SubDotTranscriptWindow(DotWindowBase):
 
     def on_node_clicked(self, widget, json_data, event):
         try:
-            json_text = json.dumps(json_data, indent=4, ensure_ascii=False) if isinstance(json_data, dict) else json_data
+            json_text = _node_text(json_data)
             print(f"노드 클릭됨: \n{json_text}")    
             TextViewDialog("노드 정보", json_text)
         except Exception as e:
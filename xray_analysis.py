@@ -0,0 +1,172 @@
+# 같은 시각으로 볼 오차 (초)
+TIME_EPSILON = 0.0005
+
+# 다른 서비스 호출로 볼 subsegment namespace
+DOWNSTREAM_NAMESPACES = ("aws", "remote")
+
+
+class Span:
+    """segment / subsegment 하나의 시간 구간과 자식 호출"""
+
+    __slots__ = ("document", "parent", "children", "depth", "self_time", "wait_time", "is_critical")
+
+    def __init__(self, document, parent=None):
+        self.document = document
+        self.parent = parent
+        self.children = []
+        self.depth = 0
+        self.self_time = 0.0
+        self.wait_time = 0.0
+        self.is_critical = False
+
+    @property
+    def id(self):
+        return self.document.get("id")
+
+    @property
+    def name(self):
+        return self.document.get("name", "")
+
+    @property
+    def start(self):
+        return self.document["start_time"]
+
+    @property
+    def end(self):
+        # 진행 중(in_progress) 인 구간은 end_time 이 없음
+        return self.document.get("end_time", self.start)
+
+    @property
+    def duration(self):
+        return max(self.end - self.start, 0.0)
+
+    @property
+    def is_downstream(self):
+        return self.document.get("namespace") in DOWNSTREAM_NAMESPACES
+
+    @property
+    def title(self):
+        """서비스명 + 작업명 + 리소스명"""
+        aws = self.document.get("aws") or {}
+        parts = [self.name]
+        if aws.get("operation"):
+            parts.append(aws["operation"])
+            if aws.get("table_name"):
+                parts.append(aws["table_name"])
+            elif aws.get("resource_names"):
+                parts.append(aws["resource_names"][0].split("/")[-1])
+        elif (self.document.get("http") or {}).get("request", {}).get("method"):
+            request = self.document["http"]["request"]
+            parts = [request["method"], "/".join(request.get("url", "").split("/")[3:]) or self.name]
+        return " ".join(parts)
+
+
+class TraceTiming:
+    """trace 의 span tree, 구간별 self / wait time, critical path"""
+
+    def __init__(self, roots):
+        self.roots = roots
+        self.spans = []
+        for root in roots:
+            self._collect(root, 0)
+        self.start = min((span.start for span in self.spans), default=0.0)
+        self.end = max((span.end for span in self.spans), default=0.0)
+        self.critical_path = []
+        for root in roots:
+            self.critical_path.extend(find_critical_path(root))
+        for span in self.critical_path:
+            span.is_critical = True
+
+    def _collect(self, span, depth):
+        """waterfall 순서 (부모 다음 자식, 시작 시각 순) 로 span 목록 생성"""
+        span.depth = depth
+        span.wait_time = covered_time(span)
+        span.self_time = max(span.duration - span.wait_time, 0.0)
+        self.spans.append(span)
+        for child in sorted(span.children, key=lambda s: s.start):
+            self._collect(child, depth + 1)
+
+    @property
+    def duration(self):
+        return max(self.end - self.start, 0.0)
+
+    def slowest_calls(self, limit):
+        """소요 시간이 긴 순서의 다른 서비스 호출 span 목록"""
+        calls = [span for span in self.spans if span.is_downstream]
+        return sorted(calls, key=lambda s: s.duration, reverse=True)[:limit]
+
+
+def covered_time(span):
+    """자식 호출이 span 구간 안에서 차지하는 시간 (겹치는 구간은 한 번만 계산)"""
+    intervals = sorted(
+        (max(child.start, span.start), min(child.end, span.end)) for child in span.children
+    )
+    covered, cursor = 0.0, span.start
+    for start, end in intervals:
+        start = max(start, cursor)
+        if end > start:
+            covered += end - start
+            cursor = end
+    return covered
+
+
+def find_critical_path(span):
+    """span 종료 시각에서 거꾸로, 마지막에 끝난 자식 호출을 따라가는 경로 (span 포함, 시작 순)"""
+    path = [span]
+    cursor = span.end
+    critical_children = []
+    for child in sorted(span.children, key=lambda s: s.end, reverse=True):
+        if child.end <= cursor + TIME_EPSILON:
+            critical_children.append(child)
+            cursor = child.start
+    for child in reversed(critical_children):
+        path.extend(find_critical_path(child))
+    return path
+
+
+def _add_span(document, parent, spans):
+    if "start_time" not in document:
+        return None
+    span = Span(document, parent)
+    spans.setdefault(span.id, span)
+    for subsegment in document.get("subsegments", []):
+        child = _add_span(subsegment, span, spans)
+        if child is not None:
+            span.children.append(child)
+    return span
+
+
+def _is_ancestor(span, other):
+    """other 가 span 자신이거나 span 아래에 있는지 (잘못된 parent_id 로 생기는 순환 방지)"""
+    while other is not None:
+        if other is span:
+            return True
+        other = other.parent
+    return False
+
+
+def analyze_trace(documents):
+    """
+    segment document 목록으로 span tree 를 만들고 timing 계산
+    segment 는 parent_id(호출한 subsegment) 아래에 연결하고, 연결되지 않는 segment 는 root
+    """
+    spans = {}
+    segment_spans = []
+    for document in documents:
+        span = _add_span(document, None, spans)
+        if span is not None:
+            segment_spans.append(span)
+
+    roots = []
+    for span in segment_spans:
+        caller = spans.get(span.document.get("parent_id"))
+        if caller is not None and not _is_ancestor(span, caller):
+            span.parent = caller
+            caller.children.append(span)
+        else:
+            roots.append(span)
+    return TraceTiming(sorted(roots, key=lambda s: s.start))
+
+
+def format_ms(seconds):
+    return f"{seconds * 1000:,.0f}ms"
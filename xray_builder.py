@@ -1,9 +1,20 @@
 import os
-import json
+import html
 
 from graphviz import Digraph
-from utils import get_xray_trace, wrap_text, apply_rank
+from utils import wrap_text, apply_rank
+from xray_client import get_xray_trace, load_cached_trace
+from xray_segments import TraceSegments
+from xray_analysis import analyze_trace, format_ms
 from graph_labels import get_image_label, get_node_label, get_module_name_ko, add_edges
+from error_rules import is_error
+from node_store import put_payload
+from graph_render import render_graph
+from lazy_graphs import register_lazy_graph
+from constants import LAZY_SUBGRAPH_FLAG, XRAY_SLOWEST_CALL_COUNT
+
+# waterfall 막대 전체 폭 (point)
+WATERFALL_WIDTH = 400
 
 
 def get_xray_edge_label(data):
@@ -32,7 +43,7 @@ def get_xray_edge_label(data):
     return label, xlabel
 
 
-def get_segment_node(xray_dot, subdata, parent_id):
+def get_segment_node(xray_dot, subdata, parent_id, contact_id):
     icon_path = f"{os.getcwd()}/mnt/aws/{subdata.get('name')}.png"
     fallback_icon = f"{os.getcwd()}/mnt/aws/settings.png"
     node_icon = icon_path if os.path.isfile(icon_path) else fallback_icon
@@ -41,7 +52,7 @@ def get_segment_node(xray_dot, subdata, parent_id):
         subdata.get("id"),
         label=get_image_label(node_icon, subdata.get("name", ""), 50),
         shape="plaintext",
-        URL=json.dumps(subdata, indent=2, ensure_ascii=False)
+        URL=put_payload(contact_id, subdata)
     )
 
     label, xlabel = get_xray_edge_label(subdata)
@@ -59,7 +70,7 @@ def get_segment_node(xray_dot, subdata, parent_id):
     return xray_dot
 
 
-def process_subsegments(xray_dot, json_data):
+def process_subsegments(xray_dot, json_data, contact_id):
     skip_names = {"Overhead", "Dwell Time", "Lambda", "QueueTime", "Initialization"}
     if json_data.get("subsegments"):
         for data in json_data["subsegments"]:
@@ -68,32 +79,77 @@ def process_subsegments(xray_dot, json_data):
             if data.get("name") == "Invocation" or "Attempt" in data.get("name"):
                 for subdata in data.get("subsegments", []):
                     if subdata.get("name") not in skip_names:
-                        xray_dot = get_segment_node(xray_dot, subdata, json_data.get("id"))
+                        xray_dot = get_segment_node(xray_dot, subdata, json_data.get("id"), contact_id)
             else:
-                xray_dot = get_segment_node(xray_dot, data, json_data.get("id"))
+                xray_dot = get_segment_node(xray_dot, data, json_data.get("id"), contact_id)
     return xray_dot
 
 
-def get_xray_parent_id(parent_id, xray_data):
-    invocation_id = None
+def get_xray_trace_file(xray_trace_id, module_stack, contact_id):
+    return f"./virtual_env/xray_trace_{contact_id}{module_stack or ''}__{xray_trace_id}"
+
+
+def get_waterfall_row(span, timing):
+    """span 한 줄 (이름, 소요 / self / wait 시간, 시작 위치와 길이를 맞춘 막대)"""
+    scale = WATERFALL_WIDTH / timing.duration if timing.duration else 0.0
+    offset = int(round((span.start - timing.start) * scale))
+    width = max(int(round(span.duration * scale)), 1)
+    color = "tomato" if span.is_critical else "lightblue"
+
+    title = html.escape(span.title)
+    if span.is_critical:
+        title = f"<b>{title}</b>"
+
+    spacer = f'<td width="{offset}" height="12" fixedsize="true"></td>' if offset else ""
+    bar = f'<td bgcolor="{color}" width="{width}" height="12" fixedsize="true"></td>'
+    return f"""<tr>
+            <td align="left">{"&nbsp;&nbsp;&nbsp;" * span.depth}{title}</td>
+            <td align="right">{format_ms(span.duration)}</td>
+            <td align="right">{format_ms(span.self_time)}</td>
+            <td align="right">{format_ms(span.wait_time)}</td>
+            <td align="left" width="{WATERFALL_WIDTH}"><table border="0" cellborder="0" cellspacing="0" cellpadding="0"><tr>{spacer}{bar}</tr></table></td>
+        </tr>"""
 
-    if parent_id:
-        for segment in xray_data:
-            for i in segment.get("subsegments", []):
-                if i["id"] == parent_id:
-                    invocation_id = segment["parent_id"]
-                    break
 
-    if invocation_id:
-        for segment in xray_data:
-            for j in segment.get("subsegments", []):
-                if j["id"] == invocation_id:
-                    return segment["id"]
+def build_xray_timing_graph(timing, xray_trace_id, xray_trace_file, contact_id):
+    """trace 의 segment 시간 구간을 waterfall 표로 표시 (critical path 는 빨간 막대, 굵은 글씨)"""
+    timing_dot = Digraph(comment=f"AWS Lambda Xray Timing : {xray_trace_id}")
+    timing_dot.attr(
+        label=f"xray_trace_id : {xray_trace_id}\n전체 {format_ms(timing.duration)}",
+        labelloc="t", fontsize="24"
+    )
+
+    rows = "".join(get_waterfall_row(span, timing) for span in timing.spans)
+    timing_dot.node(
+        "waterfall",
+        label=f"""<<table border="0" cellborder="0" cellspacing="2">
+        <tr>
+            <td bgcolor="lightgray">Segment</td>
+            <td bgcolor="lightgray">소요</td>
+            <td bgcolor="lightgray">Self</td>
+            <td bgcolor="lightgray">Wait</td>
+            <td bgcolor="lightgray">Waterfall</td>
+        </tr>{rows}</table>>""",
+        shape="plaintext",
+        URL=put_payload(contact_id, [
+            {
+                "name": span.title,
+                "offset_ms": round((span.start - timing.start) * 1000, 1),
+                "duration_ms": round(span.duration * 1000, 1),
+                "self_ms": round(span.self_time * 1000, 1),
+                "wait_ms": round(span.wait_time * 1000, 1),
+                "critical": span.is_critical,
+            }
+            for span in timing.spans
+        ])
+    )
 
-    return None
+    timing_file = f"{xray_trace_file}_timing"
+    render_graph(timing_dot, timing_file)
+    return timing_file
 
 
-def build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contact_id):
+def build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contact_id, xray_trace=None):
     xray_dot = Digraph(comment=f"AWS Lambda Xray Trace : {xray_trace_id}")
     xray_dot.attr(
         rankdir="LR",
@@ -101,14 +157,13 @@ def build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contac
         labelloc="t", fontsize="24", forcelabels="true"
     )
 
-    module_stack = module_stack or ""
-    xray_trace_file = f"./virtual_env/xray_trace_{contact_id}{module_stack}__{xray_trace_id}"
+    xray_trace_file = get_xray_trace_file(xray_trace_id, module_stack, contact_id)
 
-    with open(f"./virtual_env/batch_xray_{xray_trace_id}.json", "r", encoding="utf-8") as f:
-        xray_batch_json_data_list = json.loads(f.read())
+    xray_batch_json_data_list = xray_trace if xray_trace is not None else load_cached_trace(xray_trace_id) or []
+    trace_segments = TraceSegments(xray_batch_json_data_list)
 
     for xray_batch_json_data in xray_batch_json_data_list:
-        xray_dot = process_subsegments(xray_dot, xray_batch_json_data)
+        xray_dot = process_subsegments(xray_dot, xray_batch_json_data, contact_id)
 
         origin = xray_batch_json_data.get("origin", "")
 
@@ -125,24 +180,34 @@ def build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contac
                         xray_batch_json_data.get("id"),
                         label=get_image_label(node_icon, xray_batch_json_data.get("name"), 50),
                         shape="plaintext",
-                        URL=json.dumps(xray_batch_json_data, indent=2, ensure_ascii=False)
+                        URL=put_payload(contact_id, xray_batch_json_data)
                     )
 
-            parent_id = get_xray_parent_id(xray_batch_json_data.get("parent_id"), xray_batch_json_data_list)
+            parent_id = trace_segments.get_invoker_id(xray_batch_json_data.get("parent_id"))
             if parent_id:
                 xray_dot.edge(parent_id, xray_batch_json_data.get("id"))
 
+    timing = analyze_trace(xray_batch_json_data_list)
+    if timing.spans:
+        timing_file = build_xray_timing_graph(timing, xray_trace_id, xray_trace_file, contact_id)
+        xray_dot.node(
+            xray_trace_id + "_timing",
+            label=get_image_label(f"{os.getcwd()}/mnt/aws/XRay.png", "Timing", 30),
+            shape="plaintext",
+            URL=f"{timing_file}.dot"
+        )
+
     xray_nodes = []
     if associated_lambda_logs:
         xray_dot.node(
             xray_trace_id + "_raw_json",
             label=get_image_label(f"{os.getcwd()}/mnt/aws/CloudWatch.png", "Raw Json", 30),
             shape="plaintext",
-            URL=json.dumps(associated_lambda_logs, indent=4, ensure_ascii=False)
+            URL=put_payload(contact_id, associated_lambda_logs)
         )
 
         for index, l in enumerate(associated_lambda_logs):
-            color = 'tomato' if l.get("level") in ("ERROR", "WARN") else 'lightgray'
+            color = 'tomato' if is_error(l) else 'lightgray'
             ts = l.get("timestamp", "").replace(':', '').replace('.', '')
             node_id = f"{xray_trace_id}_{ts}_{index}"
 
@@ -181,7 +246,7 @@ def build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contac
                 shape="plaintext",
                 style='rounded,filled',
                 color=color,
-                URL=str(json.dumps(l, indent=4, ensure_ascii=False))
+                URL=put_payload(contact_id, l)
             )
             xray_nodes.append(node_id)
 
@@ -189,13 +254,17 @@ def build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contac
         if xray_nodes:
             apply_rank(xray_dot, xray_nodes)
 
-        xray_dot.render(xray_trace_file, format="dot", cleanup=True)
+        render_graph(xray_dot, xray_trace_file)
 
     return xray_trace_file
 
 
-def build_xray_dot(dot, nodes, error_count, xray_trace_id, region, function_logs, log, module_stack, contact_id):
-    xray_trace = get_xray_trace(xray_trace_id, region)
+def build_xray_dot(dot, nodes, error_count, xray_trace_id, region, trace_index, log, module_stack, contact_id, artifacts=None):
+    """
+    Lambda 호출 block 노드 추가 및 X-Ray 서브 그래프 생성
+    artifacts(ContactArtifacts) 가 있으면 trace 조회와 서브 그래프 생성을 Contact 안에서 한 번만 수행
+    """
+    xray_trace = artifacts.xray_trace(xray_trace_id) if artifacts else get_xray_trace(xray_trace_id, region)
 
     xray_text = ""
     if xray_trace:
@@ -212,15 +281,31 @@ def build_xray_dot(dot, nodes, error_count, xray_trace_id, region, function_logs
                 last_op = op
                 index += 1
 
-    associated_lambda_logs = [l for l in function_logs if l.get("xray_trace_id") == xray_trace_id]
+    # 가장 오래 걸린 다른 서비스 호출을 block 에 표시
+    for span in analyze_trace(xray_trace).slowest_calls(XRAY_SLOWEST_CALL_COUNT):
+        xray_text += f"🐢 {span.title} {format_ms(span.duration)}\n"
+
+    associated_lambda_logs = trace_index.logs(xray_trace_id)
 
-    xray_trace_file = build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contact_id)
+    xray_trace_file = get_xray_trace_file(xray_trace_id, module_stack, contact_id)
+
+    def build_subgraph():
+        if LAZY_SUBGRAPH_FLAG:
+            register_lazy_graph(
+                f"{xray_trace_file}.dot",
+                lambda: build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contact_id, xray_trace)
+            )
+            return xray_trace_file
+        return build_xray_nodes(xray_trace_id, associated_lambda_logs, module_stack, contact_id, xray_trace)
+
+    xray_trace_file = artifacts.xray_graph(xray_trace_file, build_subgraph) if artifacts else build_subgraph()
 
     levels = [l.get("level", "INFO") for l in associated_lambda_logs]
     l_warn_count = levels.count("WARN")
     l_error_count = levels.count("ERROR")
+    l_verdict_count = sum(1 for l in associated_lambda_logs if is_error(l))
 
-    color = 'tomato' if l_error_count > 0 or l_warn_count > 0 else 'lightgray'
+    color = 'tomato' if l_verdict_count > 0 else 'lightgray'
     lambda_node_footer = None
     if l_error_count > 0 or l_warn_count > 0:
         parts = []
@@ -250,7 +335,6 @@ def build_xray_dot(dot, nodes, error_count, xray_trace_id, region, function_logs
 
     nodes.append(node_id)
 
-    if l_error_count > 0 or l_warn_count > 0:
-        error_count += l_error_count + l_warn_count
+    error_count += l_verdict_count
 
     return dot, nodes, error_count
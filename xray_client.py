@@ -0,0 +1,135 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from artifact_bus import put_artifact, get_artifact
+from constants import XRAY_BATCH_SIZE, XRAY_MAX_WORKERS
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+# 이번 실행에서 조회했지만 X-Ray 에 없던 trace ID (같은 ID 재요청 방지, 파일 cache 에는 저장하지 않음)
+_missing_trace_ids = set()
+_trace_ids_lock = threading.Lock()
+
+# 이번 실행에서 X-Ray 로부터 받은 trace ID (완료되지 않은 trace 라도 같은 실행에서는 다시 요청하지 않음)
+_fetched_trace_ids = set()
+
+
+def get_trace_file_path(trace_id):
+    return f"./virtual_env/batch_xray_{trace_id}.json"
+
+
+def _get_client(region):
+    """region 별 X-Ray client (boto3 client 는 thread-safe 하므로 공유)"""
+    with _clients_lock:
+        if region not in _clients:
+            _clients[region] = boto3.client("xray", region_name=region)
+        return _clients[region]
+
+
+def is_complete_trace(documents):
+    """segment 가 있고 모든 segment 가 종료(end_time 있음, in_progress 아님)된 trace 인지"""
+    return bool(documents) and all(
+        "end_time" in document and not document.get("in_progress")
+        for document in documents
+    )
+
+
+def load_cached_trace(trace_id):
+    """
+    이번 실행에서 조회했거나 batch_xray_{id}.json 에 저장된 segment document 목록 (없으면 None)
+    X-Ray 가 아직 수집 중일 때 저장된 미완료 trace 는 이번 실행에서 다시 조회하도록 None
+    """
+    documents = get_artifact(get_trace_file_path(trace_id))
+    if documents is None:
+        return None
+    with _trace_ids_lock:
+        fetched = trace_id in _fetched_trace_ids
+    if not fetched and not is_complete_trace(documents):
+        return None
+    return documents
+
+
+def save_trace(trace_id, documents):
+    with _trace_ids_lock:
+        _fetched_trace_ids.add(trace_id)
+    put_artifact(get_trace_file_path(trace_id), documents)
+
+
+def _fetch_batch(region, trace_ids):
+    """BatchGetTraces 한 번(NextToken 페이지 포함)으로 trace ID 별 segment document 목록 조회"""
+    client = _get_client(region)
+    documents = {}
+    request = {"TraceIds": trace_ids}
+    while True:
+        response = client.batch_get_traces(**request)
+        for trace in response.get("Traces", []):
+            documents.setdefault(trace.get("Id"), []).extend(
+                json.loads(segment["Document"])
+                for segment in trace.get("Segments", [])
+                if "Document" in segment
+            )
+        if not response.get("NextToken"):
+            return documents
+        request["NextToken"] = response["NextToken"]
+
+
+def fetch_xray_batch(region, trace_ids):
+    """trace ID 묶음 하나를 조회하고 저장"""
+    try:
+        documents = _fetch_batch(region, trace_ids)
+    except Exception as e:
+        print(f"Error retrieving X-Ray traces {trace_ids}: {e}")
+        return
+
+    for trace_id in trace_ids:
+        if trace_id in documents:
+            save_trace(trace_id, documents[trace_id])
+        else:
+            with _trace_ids_lock:
+                _missing_trace_ids.add(trace_id)
+
+
+def get_pending_batches(trace_ids):
+    """cache 에 없는 trace ID 를 XRAY_BATCH_SIZE 개씩 묶은 목록"""
+    pending = [
+        trace_id for trace_id in dict.fromkeys(trace_ids)
+        if trace_id
+        and trace_id not in _missing_trace_ids
+        and load_cached_trace(trace_id) is None
+    ]
+    return [pending[i:i + XRAY_BATCH_SIZE] for i in range(0, len(pending), XRAY_BATCH_SIZE)]
+
+
+def prefetch_xray_traces(trace_ids, region):
+    """cache 에 없는 trace 를 묶음 단위로 병렬 조회하고 batch_xray_{id}.json 에 저장"""
+    batches = get_pending_batches(trace_ids)
+    if not batches:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(XRAY_MAX_WORKERS, len(batches))) as executor:
+        list(executor.map(lambda batch: fetch_xray_batch(region, batch), batches))
+
+
+def get_xray_trace(trace_id, region):
+    """trace 의 segment document 목록 (cache 에 없으면 조회, 찾을 수 없으면 빈 목록)"""
+    if not trace_id:
+        return []
+    documents = load_cached_trace(trace_id)
+    if documents is None:
+        prefetch_xray_traces([trace_id], region)
+        # 다시 조회하지 못하면 미완료 cache 라도 사용
+        documents = get_artifact(get_trace_file_path(trace_id))
+    return documents or []
+
+
+def collect_trace_ids(logs):
+    return [log.get("xray_trace_id") for log in logs if log.get("xray_trace_id")]
+
+
+def collect_lambda_trace_ids(lambda_logs):
+    """함수별 Lambda 로그(LambdaLogs) 전체의 trace ID"""
+    return [trace_id for function_logs in lambda_logs.values() for trace_id in collect_trace_ids(function_logs)]
@@ -0,0 +1,37 @@
+class TraceSegments:
+    """
+    X-Ray trace 의 segment document 목록과 id → segment, subsegment id → 소속 segment map (trace 당 한 번 생성)
+    같은 subsegment id 가 여러 segment 에 있으면 owners 는 처음, last_owners 는 마지막 segment
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.segments = {}
+        self.owners = {}
+        self.last_owners = {}
+        for segment in documents:
+            self.segments.setdefault(segment.get("id"), segment)
+            for subsegment in segment.get("subsegments", []):
+                self.owners.setdefault(subsegment.get("id"), segment)
+                self.last_owners[subsegment.get("id")] = segment
+
+    def get_owner(self, subsegment_id):
+        """subsegment 를 포함한 segment (없으면 None)"""
+        if not subsegment_id:
+            return None
+        return self.owners.get(subsegment_id)
+
+    def get_caller(self, segment):
+        """segment 의 parent_id(호출한 subsegment) 를 포함한 segment"""
+        return self.get_owner(segment.get("parent_id"))
+
+    def get_invoker_id(self, parent_id):
+        """
+        parent_id 를 포함한 segment 가 다시 호출된 subsegment 의 segment id (Lambda service → function 호출 체인)
+        체인이 끊기면 None (기존 get_xray_parent_id 와 같이 parent_id 는 마지막, 호출 subsegment 는 처음 포함한 segment 기준)
+        """
+        owner = self.last_owners.get(parent_id) if parent_id else None
+        if owner is None:
+            return None
+        invoker = self.get_caller(owner)
+        return invoker.get("id") if invoker else None
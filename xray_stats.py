@@ -0,0 +1,153 @@
+import os
+import csv
+import sys
+import glob
+import json
+import argparse
+
+import numpy as np
+
+from timestamps import to_epoch_ms
+from xray_builder import get_xray_edge_label
+
+XRAY_CACHE_PATTERN = "./virtual_env/batch_xray_*.json"
+
+# 계산할 latency 분위수
+PERCENTILES = (50, 95, 99)
+
+STATS_COLUMNS = ("service", "operation", "resource", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "error_rate")
+
+
+def get_call_key(data):
+    """subsegment 의 (service, operation, resource). X-Ray 그래프 edge label 과 같은 기준, 호출이 아니면 None"""
+    try:
+        label, xlabel = get_xray_edge_label(data)
+    except (KeyError, TypeError, AttributeError, IndexError):
+        return None, False
+    if not label:
+        return None, False
+    operation, _, resource = label.partition("\n")
+    return (data.get("name", ""), operation, resource), bool(xlabel)
+
+
+def iter_calls(document):
+    """document 아래 모든 subsegment 중 다른 서비스 호출의 (key, 시작, 소요 초, error 여부)"""
+    stack = list(document.get("subsegments", []))
+    while stack:
+        data = stack.pop()
+        stack.extend(data.get("subsegments", []))
+        if "start_time" not in data or "end_time" not in data:
+            continue
+        key, has_xlabel = get_call_key(data)
+        if key is None:
+            continue
+        is_error = has_xlabel or any(data.get(flag) for flag in ("error", "fault", "throttle"))
+        yield key, data["start_time"], data["end_time"] - data["start_time"], is_error
+
+
+def load_calls(start_time=None, end_time=None, pattern=XRAY_CACHE_PATTERN):
+    """
+    cache 된 trace document 에서 호출 목록을 읽어 (key 목록, key index, 시작, 소요, error) 배열 반환
+    start_time / end_time 은 epoch 초, 범위 밖 호출은 제외 (start_time 이전에 저장된 파일은 읽지 않음)
+    """
+    key_index = {}
+    codes, starts, durations, errors = [], [], [], []
+    for path in glob.glob(pattern):
+        if start_time is not None and os.path.getmtime(path) < start_time:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                documents = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading X-Ray cache {path}: {e}")
+            continue
+
+        for document in documents:
+            for key, started, duration, is_error in iter_calls(document):
+                codes.append(key_index.setdefault(key, len(key_index)))
+                starts.append(started)
+                durations.append(duration)
+                errors.append(is_error)
+
+    codes = np.array(codes, dtype=np.int64)
+    starts = np.array(starts, dtype=np.float64)
+    durations = np.array(durations, dtype=np.float64)
+    errors = np.array(errors, dtype=bool)
+
+    mask = np.ones(len(codes), dtype=bool)
+    if start_time is not None:
+        mask &= starts >= start_time
+    if end_time is not None:
+        mask &= starts < end_time
+    return list(key_index), codes[mask], durations[mask], errors[mask]
+
+
+def aggregate_calls(keys, codes, durations, errors, percentiles=PERCENTILES):
+    """key 별 호출 수, 분위수 / 최대 latency(ms), error 비율을 한 번의 정렬로 계산 (numpy percentile 'linear' 와 같은 보간)"""
+    if not len(codes):
+        return []
+
+    order = np.lexsort((durations, codes))
+    sorted_codes = codes[order]
+    sorted_ms = durations[order] * 1000.0
+    group_codes, group_starts, counts = np.unique(sorted_codes, return_index=True, return_counts=True)
+
+    values = {}
+    for q in percentiles:
+        position = group_starts + (counts - 1) * (q / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        values[q] = sorted_ms[lower] + (sorted_ms[upper] - sorted_ms[lower]) * (position - lower)
+    max_ms = sorted_ms[group_starts + counts - 1]
+    error_rate = np.add.reduceat(errors[order].astype(np.int64), group_starts) / counts
+
+    rows = []
+    for i, code in enumerate(group_codes):
+        service, operation, resource = keys[code]
+        row = {"service": service, "operation": operation, "resource": resource, "count": int(counts[i])}
+        for q in percentiles:
+            row[f"p{q}_ms"] = round(float(values[q][i]), 1)
+        row["max_ms"] = round(float(max_ms[i]), 1)
+        row["error_rate"] = round(float(error_rate[i]), 4)
+        rows.append(row)
+    return rows
+
+
+def print_table(rows):
+    widths = {column: max([len(column)] + [len(str(row[column])) for row in rows]) for column in STATS_COLUMNS}
+    print("  ".join(column.ljust(widths[column]) for column in STATS_COLUMNS))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in STATS_COLUMNS))
+
+
+def save_csv(rows, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STATS_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="cache 된 X-Ray trace 의 서비스 호출별 latency / error 비율 집계")
+    parser.add_argument("--start", help="시작 시각 (ISO 8601, timezone 없으면 UTC)")
+    parser.add_argument("--end", help="종료 시각 (ISO 8601, timezone 없으면 UTC)")
+    parser.add_argument("--sort", default="p95_ms", choices=STATS_COLUMNS[3:], help="정렬 기준 (내림차순)")
+    parser.add_argument("--min-count", type=int, default=1, help="표시할 최소 호출 수")
+    parser.add_argument("--limit", type=int, default=50, help="표시할 최대 행 수")
+    parser.add_argument("--csv", help="전체 결과를 저장할 CSV 파일 경로")
+    args = parser.parse_args(argv)
+
+    start_time = to_epoch_ms(args.start) / 1000 if args.start else None
+    end_time = to_epoch_ms(args.end) / 1000 if args.end else None
+
+    rows = aggregate_calls(*load_calls(start_time, end_time))
+    rows = sorted((row for row in rows if row["count"] >= args.min_count), key=lambda row: row[args.sort], reverse=True)
+
+    if args.csv:
+        save_csv(rows, args.csv)
+        print(f"X-Ray 호출 통계가 {args.csv} (으)로 저장되었습니다.")
+    print_table(rows[:args.limit])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])